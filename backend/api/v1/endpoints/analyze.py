@@ -1,23 +1,48 @@
 import asyncio
-import json
-import time
+import binascii
 import uuid
-from typing import Literal, Optional
+from typing import Callable, Literal, Optional
 
-from fastapi import APIRouter, Header, HTTPException
+from fastapi import APIRouter, File, Form, Header, HTTPException, UploadFile
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
+from core.config import settings
 from core.firebase import AuthError, get_current_user_id
 from core.firestore import firestore_client
 from core.logging import get_logger
-from core.storage import storage_client
+from core.sse import encode_sse, encode_sse_complete, now_ms
+from core.storage import decode_base64_image, sniff_image_mime, storage_client
 from features.agent.graph import stream_with_milestones
+from features.agent.vision.schema import InitialAnalysis
 
 logger = get_logger(__name__)
 
 router = APIRouter()
 
+# アイドル時にSSEのkeep-aliveコメントを送る間隔（秒）
+# プロキシのアイドルタイムアウトより十分短くする（EventSourceResponseと同じ15秒）
+KEEPALIVE_S = 15.0
+
+# keep-aliveコメント（クライアントは無視するが中継サーバーの接続は維持される）
+SSE_PING = b": ping\n\n"
+
+# エージェント完了を示すキューの終端マーカー
+_SENTINEL = object()
+
+# 実行中の保存・ユーザー作成タスク（GCで途中破棄されないよう参照を保持する）
+_background_tasks: set[asyncio.Task] = set()
+
+# multipartアップロードで受け付ける画像形式（先頭バイトで判定）
+_UPLOAD_IMAGE_MIME_TYPES = frozenset({"image/jpeg", "image/png", "image/webp"})
+
+# SSEレスポンスの共通ヘッダー
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",  # nginx でバッファリングを無効化
+}
+
 
 # --- Request/Response Models ---
 class AnalyzeRequest(BaseModel):
@@ -87,11 +112,16 @@ def _build_response(
     search_output,
     price_output,
 ) -> AnalyzeResponse:
-    """エージェント結果からレスポンスを構築"""
+    """
+    エージェント結果からレスポンスを構築
+
+    値はすべてエージェント内で検証済みのPydanticモデル由来のため、
+    model_construct でバリデーションを省略して構築する。
+    """
 
     # Vision結果がない場合
     if not analysis_result:
-        return AnalyzeResponse(
+        return AnalyzeResponse.model_construct(
             classification="unknown",
             message="画像を分析できませんでした",
             retry_advice="もう一度お試しください",
@@ -99,22 +129,22 @@ def _build_response(
 
     # prohibited または unknown の場合
     if analysis_result.category_type == "prohibited":
-        return AnalyzeResponse(
+        return AnalyzeResponse.model_construct(
             classification="prohibited",
             message="この画像は査定対象外です",
             retry_advice=analysis_result.retry_advice,
-            confidence=ConfidenceInfo(
+            confidence=ConfidenceInfo.model_construct(
                 level=analysis_result.confidence,
                 reasoning=analysis_result.reasoning,
             ),
         )
 
     if analysis_result.category_type == "unknown":
-        return AnalyzeResponse(
+        return AnalyzeResponse.model_construct(
             classification="unknown",
             message="画像から商品を特定できませんでした",
             retry_advice=analysis_result.retry_advice,
-            confidence=ConfidenceInfo(
+            confidence=ConfidenceInfo.model_construct(
                 level=analysis_result.confidence,
                 reasoning=analysis_result.reasoning,
             ),
@@ -126,12 +156,12 @@ def _build_response(
 
     # Search結果がない場合（エッジケース）
     if not search_output:
-        return AnalyzeResponse(
+        return AnalyzeResponse.model_construct(
             classification="unknown",
             item_name=item_name,
             visual_features=visual_features,
             message="商品の分類ができませんでした",
-            confidence=ConfidenceInfo(
+            confidence=ConfidenceInfo.model_construct(
                 level=analysis_result.confidence,
                 reasoning=analysis_result.reasoning,
             ),
@@ -141,13 +171,13 @@ def _build_response(
 
     # unique_item の場合
     if search_analysis.classification == "unique_item":
-        return AnalyzeResponse(
+        return AnalyzeResponse.model_construct(
             classification="unique_item",
             item_name=item_name,
             visual_features=visual_features,
             message="一点物のため市場価格の算出が困難です",
             recommendation="専門家による査定をお勧めします",
-            confidence=ConfidenceInfo(
+            confidence=ConfidenceInfo.model_construct(
                 level=search_analysis.confidence,
                 reasoning=search_analysis.reasoning,
             ),
@@ -158,13 +188,13 @@ def _build_response(
 
     # Price結果がない場合（エッジケース）
     if not price_output:
-        return AnalyzeResponse(
+        return AnalyzeResponse.model_construct(
             classification="mass_product",
             item_name=item_name,
             identified_product=identified_product,
             visual_features=visual_features,
             message="価格情報を取得できませんでした",
-            confidence=ConfidenceInfo(
+            confidence=ConfidenceInfo.model_construct(
                 level=search_analysis.confidence,
                 reasoning=search_analysis.reasoning,
             ),
@@ -173,18 +203,18 @@ def _build_response(
     # 完全な結果
     valuation = price_output.valuation
 
-    return AnalyzeResponse(
+    return AnalyzeResponse.model_construct(
         classification="mass_product",
         item_name=item_name,
         identified_product=identified_product,
         visual_features=visual_features,
-        price=PriceInfo(
+        price=PriceInfo.model_construct(
             min_price=valuation.min_price,
             max_price=valuation.max_price,
             currency=valuation.currency,
             display_message=price_output.display_message,
         ),
-        confidence=ConfidenceInfo(
+        confidence=ConfidenceInfo.model_construct(
             level=valuation.confidence,
             reasoning=search_analysis.reasoning,
         ),
@@ -195,6 +225,298 @@ def _build_response(
 # --- Streaming Endpoint ---
 
 
+async def _authenticate(authorization: Optional[str]) -> Optional[str]:
+    """認証処理（オプション）。認証ヘッダーがなければNoneを返す"""
+    if not authorization:
+        return None
+
+    try:
+        user_id = await get_current_user_id(authorization)
+        logger.info(f"Authenticated user: {user_id}")
+        return user_id
+    except AuthError as e:
+        logger.warning(f"Auth failed: {e.code} - {e.message}")
+        raise HTTPException(status_code=401, detail=e.message) from e
+
+
+def _on_user_task_done(task: asyncio.Task) -> None:
+    """ユーザー取得/作成タスクの失敗をログ出力（結果を待つ箇所がないため）"""
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning(f"Failed to get or create user: {task.exception()}")
+
+
+async def _run_agent(
+    image_data: str,
+    image_bytes: Optional[bytes],
+    thinking_queue: asyncio.Queue,
+    on_vision_complete: Optional[
+        Callable[[Optional[InitialAnalysis], Optional[bytes]], None]
+    ] = None,
+) -> dict:
+    """
+    エージェントを実行し、完了時（例外終了を含む）にキューへ終端マーカーを送る
+
+    キャンセル時はコンシューマー側が既に読み出しをやめているため送らない。
+    """
+    # 画像の参照はエージェント側（vision_node完了後に解放）だけに持たせる
+    agent = stream_with_milestones(
+        image_data, thinking_queue, image_bytes, on_vision_complete
+    )
+    del image_data, image_bytes
+    try:
+        result = await agent
+    except Exception:
+        await thinking_queue.put(_SENTINEL)
+        raise
+    await thinking_queue.put(_SENTINEL)
+    return result
+
+
+def _start_upload(user_id: str, appraisal_id: str, image_bytes: bytes) -> asyncio.Task:
+    """
+    画像アップロード（WebP変換 → GCS PUT）をバックグラウンドで開始する
+
+    禁止コンテンツをユーザーストレージに書き込まないよう、vision_node の
+    ガードレール判定を通過した後に呼び出し、search / price の実行と並行して行う。
+    """
+    upload_task = asyncio.create_task(
+        storage_client.upload_image(
+            user_id=user_id,
+            appraisal_id=appraisal_id,
+            image_bytes=image_bytes,
+        )
+    )
+    _background_tasks.add(upload_task)
+    upload_task.add_done_callback(_background_tasks.discard)
+    return upload_task
+
+
+async def _discard_upload(
+    user_id: str,
+    appraisal_id: str,
+    upload_task: asyncio.Task,
+) -> None:
+    """先行アップロードした画像を破棄する（保存しない場合）"""
+    if not upload_task.done():
+        upload_task.cancel()
+    try:
+        image_path = await upload_task
+    except BaseException:
+        # キャンセル済み、またはアップロード失敗（upload_image側でログ出力済み）。
+        # サーバー側でPUTが受理済みの場合に備え、保存先の候補パスを削除する
+        await storage_client.delete_image_for_appraisal(user_id, appraisal_id)
+        return
+    await storage_client.delete_image(image_path)
+
+
+def _schedule_discard_upload(
+    user_id: str,
+    appraisal_id: str,
+    upload_task: asyncio.Task,
+) -> None:
+    """先行アップロードの破棄をバックグラウンドで実行する"""
+    discard_task = asyncio.create_task(
+        _discard_upload(user_id, appraisal_id, upload_task)
+    )
+    _background_tasks.add(discard_task)
+    discard_task.add_done_callback(_background_tasks.discard)
+
+
+async def _persist(
+    user_id: str,
+    appraisal_id: str,
+    classification: str,
+    upload_task: Optional[asyncio.Task],
+    user_comment: str,
+    analysis_result,
+    search_output,
+    price_output,
+) -> str:
+    """
+    査定結果を保存し、査定IDを返す
+
+    画像は search / price の実行と並行してアップロード済み（upload_task）のため、
+    その完了を待って image_path を含めて1回の書き込みで保存する。
+
+    Returns:
+        保存した査定ID
+    """
+    image_path = None
+    if upload_task is not None:
+        if classification == "prohibited":
+            # prohibited の画像は保存しない（個人情報保護・コスト削減）
+            _schedule_discard_upload(user_id, appraisal_id, upload_task)
+        else:
+            try:
+                image_path = await upload_task
+            except Exception as e:
+                logger.warning(f"Failed to upload image: {e}")
+
+    # ユーザードキュメントは同じCommitでmerge作成されるため、
+    # 並行中のユーザー取得/作成（user_task）の完了は待たない
+    await firestore_client.save_appraisal(
+        user_id=user_id,
+        appraisal_id=appraisal_id,
+        ensure_user=True,
+        vision_result=analysis_result.model_dump() if analysis_result else None,
+        search_result=search_output.model_dump() if search_output else None,
+        price_result=price_output.model_dump() if price_output else None,
+        image_path=image_path,
+        user_comment=user_comment or None,
+    )
+
+    logger.info(f"Saved appraisal: {appraisal_id}")
+    return appraisal_id
+
+
+async def _event_generator(
+    image_data: str,
+    image_bytes: Optional[bytes],
+    user_id: Optional[str],
+    platform: Literal["web", "ios", "android"],
+    user_comment: str,
+):
+    """
+    SSE イベントジェネレーター
+
+    Args:
+        image_data: エージェントに渡す画像（data URL形式のBase64文字列）
+        image_bytes: デコード済みの画像バイナリ（SerpApi用アップロードと画像保存で共用）
+        user_id: 認証済みユーザーID（未認証の場合はNone）
+        platform: クライアントのプラットフォーム
+        user_comment: ユーザーからの補足コメント
+    """
+    thinking_queue: asyncio.Queue = asyncio.Queue(maxsize=settings.SSE_MAX_QUEUE_SIZE)
+
+    # ユーザードキュメントの取得/作成（初期値の補完）はエージェント実行と並行して行う。
+    # 査定保存は同じユーザードキュメントをmerge書き込みするため、完了を待たない
+    if user_id:
+        user_task = asyncio.create_task(
+            firestore_client.get_or_create_user(user_id, platform)
+        )
+        _background_tasks.add(user_task)
+        user_task.add_done_callback(_background_tasks.discard)
+        user_task.add_done_callback(_on_user_task_done)
+
+    # 画像アップロードは vision_node のガードレール判定を通過してから開始し、
+    # search / price と並行して進めて保存直前に完了を待つ
+    appraisal_id = str(uuid.uuid4())
+    upload_task: Optional[asyncio.Task] = None
+    persist_started = False
+
+    def start_upload(
+        analysis: Optional[InitialAnalysis], vision_image_bytes: Optional[bytes]
+    ) -> None:
+        nonlocal upload_task
+        if (
+            user_id
+            and vision_image_bytes
+            and analysis is not None
+            and analysis.category_type != "prohibited"
+        ):
+            upload_task = _start_upload(user_id, appraisal_id, vision_image_bytes)
+
+    # エージェント実行タスクを開始
+    agent_task = asyncio.create_task(
+        _run_agent(image_data, image_bytes, thinking_queue, start_upload)
+    )
+
+    # 画像はエージェントとアップロードタスクだけが使うため、ここでは参照を手放し
+    # 使い終わった時点（vision_node完了・WebP変換後）でGCに解放されるようにする
+    del image_data, image_bytes
+
+    try:
+        # 終端マーカーを受け取るまでキューのイベントを順に送信
+        while True:
+            try:
+                async with asyncio.timeout(KEEPALIVE_S):
+                    item = await thinking_queue.get()
+            except asyncio.TimeoutError:
+                # アイドル中はSSEコメントを送ってプロキシのタイムアウトを防ぐ
+                yield SSE_PING
+                continue
+
+            if item is _SENTINEL:
+                break
+
+            # キューにはエージェント側でSSE形式に変換済みのバイト列が入っている
+            event_type, chunk = item
+            yield chunk
+
+            # エラーイベントを受け取ったらログ出力のみ
+            if event_type == "error":
+                logger.warning(f"Node error: {chunk.decode('utf-8').strip()}")
+
+        # エージェントの結果を取得
+        result = await agent_task
+        analysis_result = result.get("analysis_result")
+        search_output = result.get("search_output")
+        price_output = result.get("price_output")
+
+        # 最終結果を構築
+        response = _build_response(analysis_result, search_output, price_output)
+
+        # 認証済みユーザーの場合は保存
+        # クライアント切断でジェネレーターがキャンセルされても保存は完了させる
+        if user_id:
+            persist_started = True
+            persist_task = asyncio.create_task(
+                _persist(
+                    user_id,
+                    appraisal_id,
+                    response.classification,
+                    upload_task,
+                    user_comment,
+                    analysis_result,
+                    search_output,
+                    price_output,
+                )
+            )
+            _background_tasks.add(persist_task)
+            persist_task.add_done_callback(_background_tasks.discard)
+            response.appraisal_id = await asyncio.shield(persist_task)
+
+        # 完了イベントを送信（pydantic-coreで直接JSON化して埋め込む）
+        yield encode_sse_complete(response.model_dump_json().encode())
+
+    except Exception as e:
+        logger.error(f"Streaming endpoint error: {e}", exc_info=True)
+        error_event = {
+            "type": "error",
+            "message": "査定処理中にエラーが発生しました",
+            "timestamp": now_ms(),
+        }
+        yield encode_sse(error_event)
+    finally:
+        # タスクがまだ実行中なら キャンセル
+        # （キャンセル後はアップロードが新たに開始されないため、先に止める）
+        if not agent_task.done():
+            agent_task.cancel()
+            try:
+                await agent_task
+            except asyncio.CancelledError:
+                pass
+
+        # 保存に至らなかった場合（エラー・クライアント切断）は先行アップロードを破棄
+        if upload_task is not None and not persist_started:
+            _schedule_discard_upload(user_id, appraisal_id, upload_task)
+
+
+def _stream_response(
+    image_data: str,
+    image_bytes: Optional[bytes],
+    user_id: Optional[str],
+    platform: Literal["web", "ios", "android"],
+    user_comment: str,
+) -> StreamingResponse:
+    """SSEのStreamingResponseを構築"""
+    return StreamingResponse(
+        _event_generator(image_data, image_bytes, user_id, platform, user_comment),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+
 @router.post("/analyze/stream")
 async def analyze_image_stream(
     request: AnalyzeRequest,
@@ -207,157 +529,58 @@ async def analyze_image_stream(
     各ノード（vision, search, price）の思考過程を行単位でストリーミングし、
     最後に complete イベントで査定結果を返します。
     """
-    user_id: Optional[str] = None
-
-    # 認証処理（オプション）
-    if authorization:
-        try:
-            user_id = await get_current_user_id(authorization)
-            await firestore_client.get_or_create_user(user_id, request.platform)
-            logger.info(f"Authenticated user: {user_id}")
-        except AuthError as e:
-            logger.warning(f"Auth failed: {e.code} - {e.message}")
-            raise HTTPException(status_code=401, detail=e.message)
-
-    async def event_generator():
-        """SSE イベントジェネレーター"""
-        thinking_queue: asyncio.Queue = asyncio.Queue()
-
-        # エージェント実行タスクを開始
-        agent_task = asyncio.create_task(
-            stream_with_milestones(request.image_base64, thinking_queue)
-        )
+    user_id = await _authenticate(authorization)
+
+    # 画像バイナリは入口で一度だけデコードし、SerpApi用アップロードと保存で共用する
+    try:
+        image_bytes = decode_base64_image(request.image_base64)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail="画像データが不正です") from e
+
+    return _stream_response(
+        request.image_base64,
+        image_bytes,
+        user_id,
+        request.platform,
+        request.user_comment,
+    )
 
-        try:
-            # キューからイベントを取得してSSEで送信
-            while True:
-                try:
-                    # タイムアウト付きでキューから取得
-                    event = await asyncio.wait_for(thinking_queue.get(), timeout=60.0)
-
-                    # SSEイベントを構築
-                    sse_event = {
-                        "type": event.get("type"),
-                        "node": event.get("node"),
-                        "timestamp": int(time.time() * 1000),
-                    }
-
-                    # node_complete はクライアントに送信不要（表示情報なし）
-                    if event["type"] == "node_complete":
-                        continue
-
-                    if event["type"] == "thinking":
-                        sse_event["message"] = event.get("content", "")
-                    elif event["type"] == "node_start":
-                        sse_event["message"] = event.get("message", "")
-                    elif event["type"] == "error":
-                        sse_event["message"] = event.get("message", "")
-
-                    yield f"data: {json.dumps(sse_event, ensure_ascii=False)}\n\n"
-
-                    # node_end イベントはエージェント内部で使用
-                    # エラーイベントを受け取ったらログ出力のみ
-                    if event["type"] == "error":
-                        logger.warning(f"Node error: {event}")
-
-                except asyncio.TimeoutError:
-                    # タイムアウトしたらエージェントが完了したかチェック
-                    if agent_task.done():
-                        break
-                    continue
-
-                # エージェントタスクが完了したらループを抜ける
-                if agent_task.done():
-                    # 残りのイベントを処理
-                    while not thinking_queue.empty():
-                        event = thinking_queue.get_nowait()
-                        sse_event = {
-                            "type": event.get("type"),
-                            "node": event.get("node"),
-                            "timestamp": int(time.time() * 1000),
-                        }
-                        if event["type"] == "node_complete":
-                            continue
-
-                        if event["type"] == "thinking":
-                            sse_event["message"] = event.get("content", "")
-                        elif event["type"] in ["node_start", "error"]:
-                            sse_event["message"] = event.get("message", "")
-
-                        yield f"data: {json.dumps(sse_event, ensure_ascii=False)}\n\n"
-                    break
-
-            # エージェントの結果を取得
-            result = await agent_task
-            analysis_result = result.get("analysis_result")
-            search_output = result.get("search_output")
-            price_output = result.get("price_output")
-
-            # 最終結果を構築
-            response = _build_response(analysis_result, search_output, price_output)
-
-            # 認証済みユーザーの場合は保存
-            if user_id:
-                appraisal_id = str(uuid.uuid4())
-
-                image_path = None
-                # prohibited以外の場合のみ画像を保存（個人情報保護・コスト削減）
-                if response.classification != "prohibited":
-                    try:
-                        image_path = await storage_client.upload_image(
-                            user_id=user_id,
-                            appraisal_id=appraisal_id,
-                            image_base64=request.image_base64,
-                        )
-                        logger.info(f"Uploaded image: {image_path}")
-                    except Exception as e:
-                        logger.warning(f"Failed to upload image: {e}")
-
-                await firestore_client.save_appraisal(
-                    user_id=user_id,
-                    appraisal_id=appraisal_id,
-                    vision_result=analysis_result.model_dump()
-                    if analysis_result
-                    else None,
-                    search_result=search_output.model_dump() if search_output else None,
-                    price_result=price_output.model_dump() if price_output else None,
-                    image_path=image_path,
-                    user_comment=request.user_comment or None,
-                )
-                response.appraisal_id = appraisal_id
-                logger.info(f"Saved appraisal: {appraisal_id}")
-
-            # 完了イベントを送信
-            complete_event = {
-                "type": "complete",
-                "result": response.model_dump(),
-                "timestamp": int(time.time() * 1000),
-            }
-            yield f"data: {json.dumps(complete_event, ensure_ascii=False)}\n\n"
-
-        except Exception as e:
-            logger.error(f"Streaming endpoint error: {e}", exc_info=True)
-            error_event = {
-                "type": "error",
-                "message": "査定処理中にエラーが発生しました",
-                "timestamp": int(time.time() * 1000),
-            }
-            yield f"data: {json.dumps(error_event, ensure_ascii=False)}\n\n"
-        finally:
-            # タスクがまだ実行中なら キャンセル
-            if not agent_task.done():
-                agent_task.cancel()
-                try:
-                    await agent_task
-                except asyncio.CancelledError:
-                    pass
 
-    return StreamingResponse(
-        event_generator(),
-        media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "X-Accel-Buffering": "no",  # nginx でバッファリングを無効化
-        },
+@router.post("/analyze/stream/upload")
+async def analyze_image_stream_upload(
+    file: UploadFile = File(..., description="Image file"),
+    user_comment: str = Form(default="", description="Optional user comment"),
+    platform: Literal["web", "ios", "android"] = Form(
+        default="web", description="Client platform"
+    ),
+    authorization: Optional[str] = Header(None, description="Bearer token"),
+):
+    """
+    multipart/form-data で画像を受け取るストリーミングエンドポイント
+
+    画像をJSON内のBase64文字列として送らずに済むため、リクエストのパースと
+    メモリ使用量を抑えられます。レスポンスは /analyze/stream と同じSSEです。
+    """
+    user_id = await _authenticate(authorization)
+
+    image_bytes = await file.read()
+    if not image_bytes:
+        raise HTTPException(status_code=400, detail="画像データが空です")
+
+    # クライアント申告の Content-Type は信用せず、先頭バイトから形式を判定する
+    mime_type = sniff_image_mime(image_bytes)
+    if mime_type not in _UPLOAD_IMAGE_MIME_TYPES:
+        raise HTTPException(
+            status_code=400, detail="JPEG・PNG・WebP形式の画像を送信してください"
+        )
+
+    # エージェント（Gemini）にはdata URL形式で渡す
+    # Base64の中間バッファ（bytes → str → 連結）が同時に複数残らないよう、
+    # バイト列のままヘッダーを連結してから一度だけ str に変換する
+    encoded = b"data:%s;base64," % mime_type.encode("ascii") + binascii.b2a_base64(
+        image_bytes, newline=False
     )
+    image_data = encoded.decode("latin-1")
+    del encoded
+
+    return _stream_response(image_data, image_bytes, user_id, platform, user_comment)
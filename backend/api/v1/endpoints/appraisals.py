@@ -14,7 +14,11 @@ router = APIRouter()
 @router.get("/appraisals")
 async def get_appraisal_history(
     limit: int = Query(default=20, ge=1, le=100, description="取得件数"),
-    offset: int = Query(default=0, ge=0, description="スキップ件数"),
+    offset: int = Query(default=0, ge=0, description="スキップ件数（非推奨）"),
+    cursor: Optional[str] = Query(default=None, description="前ページの next_cursor"),
+    fields: Optional[str] = Query(
+        default=None, description="取得するフィールド（カンマ区切り、省略時は全件）"
+    ),
     authorization: Optional[str] = Header(None, description="Bearer token"),
 ):
     """
@@ -29,15 +33,26 @@ async def get_appraisal_history(
         logger.warning(f"Auth failed: {e.code} - {e.message}")
         raise HTTPException(status_code=401, detail=e.message)
 
+    field_list = None
+    if fields:
+        field_list = [f.strip() for f in fields.split(",") if f.strip()]
+
     try:
-        appraisals = await firestore_client.get_appraisal_history(
+        appraisals, next_cursor = await firestore_client.get_appraisal_history(
             user_id=user_id,
             limit=limit,
             offset=offset,
+            cursor=cursor,
+            fields=field_list,
         )
-        user = await firestore_client.get_or_create_user(user_id)
+        # 総件数は厳密な鮮度が不要なため、キャッシュ済みのユーザー情報を使う
+        user = await firestore_client.get_user_cached(user_id)
         total = user.get("total_appraisals", 0)
-        return {"appraisals": appraisals, "total": total}
+        return {"appraisals": appraisals, "total": total, "next_cursor": next_cursor}
+    except ValueError as e:
+        raise HTTPException(
+            status_code=400, detail="cursor または fields が不正です"
+        ) from e
     except Exception as e:
         logger.error(f"Failed to get appraisal history: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Internal Server Error")
@@ -1,3 +1,4 @@
+from functools import cached_property
 from typing import Optional
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -18,6 +19,11 @@ class Settings(BaseSettings):
 
     MODEL_VISION_NODE: str  # .envで設定必須
     MODEL_SEARCH_NODE: str
+    PRICE_SPECULATIVE_PREFETCH: bool = True  # search_nodeと並行して価格検索を先行実行
+    SEARCH_SKU_SHORT_CIRCUIT: bool = True  # 型番まで特定済みなら市場検索を省略
+    # ナレッジグラフと類似商品が一致すればLLMでの商品特定を省略
+    VISION_KG_SHORT_CIRCUIT: bool = True
+    GEMINI_MAX_RPS: float = 0  # Gemini呼び出しの上限（件/秒、0で無制限）
 
     # Firebase設定（オプション - ADC使用時は不要）
     GOOGLE_APPLICATION_CREDENTIALS: Optional[str] = None
@@ -26,23 +32,38 @@ class Settings(BaseSettings):
     SERPAPI_API_KEY: str = ""  # .envで設定必須
     SERPAPI_TIMEOUT_SECONDS: int = 60
     SERPAPI_IMAGE_EXPIRATION_MINUTES: int = 5  # SerpApi用一時URL有効期限
+    SERPAPI_MAX_RPS: float = 0  # SerpApi呼び出しの上限（件/秒、0で無制限）
 
     # ガードレール設定
     MODEL_GUARDRAIL: str = "gemini-3-flash-preview"  # 軽量モデル
     ENABLE_GUARDRAIL_CHECK: bool = True
+    # 常に観察内容・理由付きで判定する（通常はY/Nの1文字判定）
+    GUARDRAIL_VERBOSE: bool = False
 
     # Cloud Storage設定
     GCS_BUCKET_NAME: str = "ojoya-images-dev"  # 本番: ojoya-images-prod
     GCS_IMAGE_EXPIRATION_MINUTES: int = 60  # 署名付きURLの有効期限
+    WEBP_QUALITY: int = 82  # 保存画像のWebP画質（1-100）
+    WEBP_METHOD: int = 2  # WebPエンコードの圧縮努力（0-6、小さいほど高速）
+    WEBP_MAX_DIMENSION: int = 1600  # 保存画像の長辺の上限（px）
+    # この容量以下のJPEGは再エンコードせず保存
+    IMAGE_PASSTHROUGH_JPEG_MAX_BYTES: int = 600_000
+
+    # Firestore設定
+    FIRESTORE_TRANSACTIONAL_SAVE: bool = False  # 査定保存をトランザクションで行う
+
+    # SSE設定
+    SSE_MAX_QUEUE_SIZE: int = 1000  # thinkingキューの上限（低速クライアント対策）
+    SSE_QUEUE_TIMEOUT: float = 5.0  # キュー投入のタイムアウト（秒）
 
     # CORS設定
     CORS_ORIGINS: str = "http://localhost:3000,http://127.0.0.1:3000"
 
-    @property
+    @cached_property
     def cors_origins_list(self) -> list[str]:
         return [origin.strip() for origin in self.CORS_ORIGINS.split(",")]
 
     model_config = SettingsConfigDict(env_file=".env", env_ignore_empty=True)
 
 
-settings = Settings()
\ No newline at end of file
+settings = Settings()
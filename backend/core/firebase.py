@@ -4,7 +4,13 @@ Firebase Admin SDK 初期化モジュール
 - Cloud Run環境ではADC（Application Default Credentials）を自動使用
 - ローカル開発時はGOOGLE_APPLICATION_CREDENTIALS環境変数を使用
 """
+import asyncio
+import base64
+import hashlib
+import json
 import os
+import time
+from collections import OrderedDict
 from functools import lru_cache
 from typing import Optional
 
@@ -16,6 +22,13 @@ from core.logging import get_logger
 
 logger = get_logger(__name__)
 
+# 検証済みトークンのキャッシュ設定
+TOKEN_CACHE_MAX_SIZE = 10_000
+TOKEN_CACHE_TTL_SECONDS = 300
+
+# トークンハッシュ -> (有効期限のUNIX時刻, デコード済みトークン)
+_token_cache: OrderedDict[bytes, tuple[float, dict]] = OrderedDict()
+
 
 class AuthError(Exception):
     """認証エラー"""
@@ -69,6 +82,51 @@ def initialize_firebase() -> firebase_admin.App:
         raise
 
 
+def _build_warmup_token() -> str:
+    """
+    ウォームアップ用のダミーID Tokenを生成
+
+    クレームは検証を通過する形式にしておき、公開鍵の取得まで進ませる。
+    署名は不正なので検証自体は必ず失敗する。
+    """
+
+    def _encode(data: dict) -> str:
+        raw = json.dumps(data).encode("utf-8")
+        return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+    now = int(time.time())
+    header = {"alg": "RS256", "kid": "warmup", "typ": "JWT"}
+    payload = {
+        "aud": settings.GCP_PROJECT_ID,
+        "iss": f"https://securetoken.google.com/{settings.GCP_PROJECT_ID}",
+        "sub": "warmup",
+        "iat": now,
+        "exp": now + 3600,
+    }
+    return f"{_encode(header)}.{_encode(payload)}.{_encode({'sig': 'warmup'})}"
+
+
+def warmup_firebase() -> None:
+    """
+    Firebase Admin SDK をウォームアップ（起動時に呼び出す）
+
+    初回の verify_id_token はSDKの認証クライアント生成とGoogle公開鍵の取得で
+    数秒かかるため、ダミートークンの検証で起動時に済ませておく。
+    """
+    initialize_firebase()
+
+    try:
+        auth.verify_id_token(_build_warmup_token(), check_revoked=False)
+    except auth.InvalidIdTokenError:
+        # 署名が不正なため失敗するのは想定どおり（公開鍵はキャッシュ済み）
+        pass
+    except Exception as e:
+        logger.warning(f"Firebase warmup failed: {e}")
+        return
+
+    logger.info("Firebase auth warmed up")
+
+
 def verify_id_token(id_token: str, check_revoked: bool = False) -> dict:
     """
     Firebase ID Token を検証し、デコードされたトークン情報を返す
@@ -103,6 +161,39 @@ def verify_id_token(id_token: str, check_revoked: bool = False) -> dict:
         raise AuthError(f"認証エラー: {str(e)}", code="auth_error")
 
 
+async def averify_id_token(id_token: str) -> dict:
+    """
+    verify_id_token の非同期版（TTLキャッシュ付き）
+
+    検証はネットワーク（公開鍵取得）とCPU（RSA署名検証）を使うブロッキング処理のため、
+    スレッドプールで実行してイベントループを塞がないようにする。
+    検証結果は最大 TOKEN_CACHE_TTL_SECONDS 秒（トークンの有効期限まで）キャッシュする。
+
+    Raises:
+        AuthError: トークンが無効な場合
+    """
+    key = hashlib.blake2b(id_token.encode("utf-8"), digest_size=16).digest()
+    now = time.time()
+
+    cached = _token_cache.get(key)
+    if cached is not None:
+        expires_at, decoded_token = cached
+        if now < expires_at:
+            _token_cache.move_to_end(key)
+            return decoded_token
+        del _token_cache[key]
+
+    loop = asyncio.get_running_loop()
+    decoded_token = await loop.run_in_executor(None, verify_id_token, id_token, False)
+
+    expires_at = min(decoded_token.get("exp", now), now + TOKEN_CACHE_TTL_SECONDS)
+    _token_cache[key] = (expires_at, decoded_token)
+    while len(_token_cache) > TOKEN_CACHE_MAX_SIZE:
+        _token_cache.popitem(last=False)
+
+    return decoded_token
+
+
 def get_user_from_token(id_token: str) -> Optional[dict]:
     """
     ID Token からユーザー情報を取得
@@ -150,5 +241,5 @@ async def get_current_user_id(authorization: Optional[str]) -> str:
     if not token:
         raise AuthError("トークンが空です", code="empty_token")
 
-    decoded_token = verify_id_token(token)
+    decoded_token = await averify_id_token(token)
     return decoded_token["uid"]
@@ -3,14 +3,23 @@ Firestoreクライアントラッパーモジュール
 
 DBアクセス時に自動的にログ出力する設計。
 """
+import asyncio
+import base64
+import binascii
+import threading
+import time
 import uuid
+from collections import OrderedDict
 from datetime import datetime, timezone
 from typing import Any, Literal, Optional
 
+import grpc
 from firebase_admin import firestore
 from google.cloud.firestore import Client
 from google.cloud.firestore_v1.collection import CollectionReference
+from google.cloud.firestore_v1.field_path import FieldPath
 
+from core.config import settings
 from core.firebase import initialize_firebase
 from core.logging import get_logger
 from core.storage import storage_client
@@ -26,26 +35,119 @@ TerminationPoint = Literal[
 ]
 OverallStatus = Literal["completed", "incomplete", "error", "pending_reappraisal"]
 
+# Visionのカテゴリで処理が終了する場合の終了ポイント
+_VISION_TERMINATION: dict[Optional[str], TerminationPoint] = {
+    "prohibited": "vision_prohibited",
+    "unknown": "vision_unknown",
+}
+
+# Priceのステータス -> 終了ポイント（該当なしは price_error）
+_PRICE_TERMINATION: dict[Optional[str], TerminationPoint] = {
+    "complete": "price_complete",
+}
+
+# 終了ポイント -> 全体ステータス
+_OVERALL_STATUS: dict[TerminationPoint, OverallStatus] = {
+    "price_complete": "completed",
+    "search_unique": "completed",
+    "price_error": "error",
+    "vision_prohibited": "incomplete",
+    "vision_unknown": "incomplete",
+}
+
+# ユーザードキュメントのプロセス内キャッシュ上限
+USER_CACHE_MAX_SIZE = 10_000
+
+# 単一ドキュメント読み取りのプロセス内キャッシュ設定
+DOC_CACHE_MAX_SIZE = 1024
+DOC_CACHE_TTL_SECONDS = 30.0
+
+# 履歴取得でフィールドを絞る場合も常に取得するフィールド（カーソル・署名付きURL用）
+_HISTORY_REQUIRED_FIELDS = ("created_at", "image_path")
+# 履歴カーソル内の created_at とドキュメントIDの区切り（ISO 8601表記には現れない）
+_HISTORY_CURSOR_SEP = "|"
+
+# 接続確認の設定（成功結果の再利用間隔、チャネル接続待ちのタイムアウト）
+CONNECTION_CHECK_INTERVAL_SECONDS = 30.0
+CONNECTION_CHECK_TIMEOUT_SECONDS = 2.0
+
 
 class FirestoreClient:
-    """Firestoreクライアントのラッパー（自動ログ出力対応）"""
+    """
+    Firestoreクライアントのラッパー（自動ログ出力対応）
+
+    SDKの呼び出しは同期I/Oのため、イベントループを塞がないよう
+    asyncio.to_thread で実行する。Firestoreクライアント（gRPCチャネル）は
+    クラス属性としてプロセス内で1つだけ保持し、インスタンスを増やしても共有される。
+    通常はモジュール末尾の firestore_client を使うこと。
+    """
+
+    # プロセス共有のFirestoreクライアント
+    # （ワーカースレッドからの同時初期化をロックで防ぐ）
+    _db: Client | None = None
+    _db_lock = threading.Lock()
 
     def __init__(self):
-        self._db: Client | None = None
         self._logger = get_logger(__name__)
+        # user_id -> (取得時刻, ユーザードキュメント)
+        self._user_cache: OrderedDict[str, tuple[float, dict[str, Any]]] = OrderedDict()
+        # 直近で接続確認に成功した時刻
+        self._connection_ok_at: float | None = None
+        # (コレクションパス, ドキュメントID) -> (取得時刻, ドキュメント)
+        self._doc_cache: OrderedDict[
+            tuple[str, str], tuple[float, dict[str, Any]]
+        ] = OrderedDict()
 
     @property
     def db(self) -> Client:
         """遅延初期化でFirestoreクライアント取得"""
-        if self._db is None:
-            initialize_firebase()
-            self._db = firestore.client()
-            self._logger.info("Firestore client initialized")
-        return self._db
+        db = FirestoreClient._db
+        if db is None:
+            with FirestoreClient._db_lock:
+                db = FirestoreClient._db
+                if db is None:
+                    # initialize_firebase は lru_cache により冪等
+                    initialize_firebase()
+                    db = FirestoreClient._db = firestore.client()
+                    self._logger.info("Firestore client initialized")
+        return db
+
+    async def close(self) -> None:
+        """Firestoreクライアント（gRPCチャネル）を閉じる（アプリ終了時に呼び出す）"""
+        with FirestoreClient._db_lock:
+            if FirestoreClient._db is not None:
+                FirestoreClient._db.close()
+                FirestoreClient._db = None
+                self._logger.info("Firestore client closed")
+
+    def _get_cached_doc(self, collection: str, doc_id: str) -> dict[str, Any] | None:
+        """キャッシュ済みドキュメントを取得（期限切れ・未登録はNone）"""
+        key = (collection, doc_id)
+        cached = self._doc_cache.get(key)
+        if cached is None:
+            return None
+        if time.monotonic() - cached[0] >= DOC_CACHE_TTL_SECONDS:
+            del self._doc_cache[key]
+            return None
+        self._doc_cache.move_to_end(key)
+        # 呼び出し側での変更がキャッシュに及ばないようコピーを返す
+        return dict(cached[1])
+
+    def _cache_doc(self, collection: str, doc_id: str, data: dict[str, Any]) -> None:
+        """ドキュメントをキャッシュに登録（上限を超えたら古いものから破棄）"""
+        key = (collection, doc_id)
+        self._doc_cache[key] = (time.monotonic(), dict(data))
+        self._doc_cache.move_to_end(key)
+        while len(self._doc_cache) > DOC_CACHE_MAX_SIZE:
+            self._doc_cache.popitem(last=False)
+
+    def _invalidate_doc(self, collection: str, doc_id: str) -> None:
+        """書き込み時にキャッシュを破棄"""
+        self._doc_cache.pop((collection, doc_id), None)
 
     def collection(self, path: str) -> CollectionReference:
         """コレクション参照取得（ログ出力付き）"""
-        self._logger.debug(f"Accessing collection: {path}")
+        self._logger.debug("Accessing collection: %s", path)
         return self.db.collection(path)
 
     async def get_document(self, collection: str, doc_id: str) -> dict[str, Any] | None:
@@ -59,13 +161,20 @@ class FirestoreClient:
         Returns:
             ドキュメントデータ、存在しない場合はNone
         """
-        self._logger.info(f"GET {collection}/{doc_id}")
+        cached = self._get_cached_doc(collection, doc_id)
+        if cached is not None:
+            self._logger.debug("Document cache hit: %s/%s", collection, doc_id)
+            return cached
+
+        self._logger.info("GET %s/%s", collection, doc_id)
         ref = self.db.collection(collection).document(doc_id)
-        doc = ref.get()
+        doc = await asyncio.to_thread(ref.get)
         if doc.exists:
-            self._logger.debug(f"Document found: {collection}/{doc_id}")
-            return doc.to_dict()
-        self._logger.debug(f"Document not found: {collection}/{doc_id}")
+            self._logger.debug("Document found: %s/%s", collection, doc_id)
+            data = doc.to_dict()
+            self._cache_doc(collection, doc_id, data)
+            return data
+        self._logger.debug("Document not found: %s/%s", collection, doc_id)
         return None
 
     async def set_document(
@@ -84,10 +193,11 @@ class FirestoreClient:
             data: 保存するデータ
             merge: Trueの場合、既存データとマージ
         """
-        self._logger.info(f"SET {collection}/{doc_id} (merge={merge})")
+        self._logger.info("SET %s/%s (merge=%s)", collection, doc_id, merge)
         ref = self.db.collection(collection).document(doc_id)
-        ref.set(data, merge=merge)
-        self._logger.debug(f"Document written: {collection}/{doc_id}")
+        await asyncio.to_thread(ref.set, data, merge=merge)
+        self._invalidate_doc(collection, doc_id)
+        self._logger.debug("Document written: %s/%s", collection, doc_id)
 
     async def update_document(
         self,
@@ -103,10 +213,11 @@ class FirestoreClient:
             doc_id: ドキュメントID
             data: 更新するフィールドとその値
         """
-        self._logger.info(f"UPDATE {collection}/{doc_id}")
+        self._logger.info("UPDATE %s/%s", collection, doc_id)
         ref = self.db.collection(collection).document(doc_id)
-        ref.update(data)
-        self._logger.debug(f"Document updated: {collection}/{doc_id}")
+        await asyncio.to_thread(ref.update, data)
+        self._invalidate_doc(collection, doc_id)
+        self._logger.debug("Document updated: %s/%s", collection, doc_id)
 
     async def delete_document(self, collection: str, doc_id: str) -> None:
         """
@@ -116,29 +227,45 @@ class FirestoreClient:
             collection: コレクション名
             doc_id: ドキュメントID
         """
-        self._logger.info(f"DELETE {collection}/{doc_id}")
+        self._logger.info("DELETE %s/%s", collection, doc_id)
         ref = self.db.collection(collection).document(doc_id)
-        ref.delete()
-        self._logger.debug(f"Document deleted: {collection}/{doc_id}")
+        await asyncio.to_thread(ref.delete)
+        self._invalidate_doc(collection, doc_id)
+        self._logger.debug("Document deleted: %s/%s", collection, doc_id)
+
+    def _wait_for_channel_ready(self) -> None:
+        """gRPCチャネルの接続確立を待つ（ドキュメント読み取りを伴わない）"""
+        channel = self.db._firestore_api.transport.grpc_channel
+        grpc.channel_ready_future(channel).result(
+            timeout=CONNECTION_CHECK_TIMEOUT_SECONDS
+        )
 
     async def check_connection(self) -> dict[str, Any]:
         """
         Firestore接続テスト
 
+        課金対象の読み取りを避けるためgRPCチャネルの状態のみ確認し、
+        成功結果は一定時間キャッシュする（ヘルスチェックの頻繁な呼び出し向け）。
+
         Returns:
             接続状態を含む辞書
         """
+        if (
+            self._connection_ok_at is not None
+            and time.monotonic() - self._connection_ok_at
+            < CONNECTION_CHECK_INTERVAL_SECONDS
+        ):
+            return {"status": "connected"}
+
         self._logger.info("Checking Firestore connection...")
         try:
-            test_ref = self.db.collection("_health_check").document("test")
-            doc = test_ref.get()
+            await asyncio.to_thread(self._wait_for_channel_ready)
+            self._connection_ok_at = time.monotonic()
             self._logger.info("Firestore connection successful")
-            return {
-                "status": "connected",
-                "document_exists": doc.exists,
-            }
+            return {"status": "connected"}
         except Exception as e:
-            self._logger.error(f"Firestore connection failed: {e}", exc_info=True)
+            self._connection_ok_at = None
+            self._logger.error("Firestore connection failed: %s", e, exc_info=True)
             return {
                 "status": "error",
                 "error": str(e),
@@ -163,27 +290,73 @@ class FirestoreClient:
         Returns:
             ユーザードキュメントのデータ
         """
-        self._logger.info(f"GET_OR_CREATE users/{user_id}")
+        self._logger.info("GET_OR_CREATE users/%s", user_id)
         user_ref = self.db.collection("users").document(user_id)
-        doc = user_ref.get()
 
-        if doc.exists:
-            # 既存ユーザー: last_active_at を更新
-            user_ref.update({"last_active_at": firestore.SERVER_TIMESTAMP})
-            return doc.to_dict()
+        # last_active_at の更新は読み取り結果に依存しないため、
+        # merge書き込みにして読み取りと並行で送る（既存ユーザーは1往復で済む）
+        doc, _ = await asyncio.gather(
+            asyncio.to_thread(user_ref.get),
+            asyncio.to_thread(
+                user_ref.set,
+                {"last_active_at": firestore.SERVER_TIMESTAMP},
+                merge=True,
+            ),
+        )
+
+        # 並行した書き込みが先に反映された新規ユーザーは last_active_at だけの
+        # ドキュメントとして読めるため、created_at の有無で既存かを判定する
+        user = doc.to_dict() if doc.exists else None
+        if user and "created_at" in user:
+            return user
 
         # 新規ユーザー作成
+        # save_appraisal(ensure_user=True) が先にカウンターを加算している
+        # 場合があるため、total_appraisals は Increment(0)
+        # （未設定なら0、既存値は維持）で初期化する
         user_data = {
             "uid": user_id,
             "created_at": firestore.SERVER_TIMESTAMP,
             "last_active_at": firestore.SERVER_TIMESTAMP,
             "platform": platform,
-            "total_appraisals": 0,
+            "total_appraisals": firestore.Increment(0),
             "account_status": "active",
         }
-        user_ref.set(user_data)
-        self._logger.info(f"Created new user: {user_id}")
-        return user_data
+        await asyncio.to_thread(user_ref.set, user_data, merge=True)
+        self._logger.info("Created new user: %s", user_id)
+        total_appraisals = (user or {}).get("total_appraisals", 0)
+        return {**user_data, "total_appraisals": total_appraisals}
+
+    async def get_user_cached(
+        self,
+        user_id: str,
+        ttl: float = 30.0,
+    ) -> dict[str, Any]:
+        """
+        ユーザードキュメントを取得（プロセス内TTLキャッシュ付き）
+
+        total_appraisals の表示など、厳密な鮮度が不要な用途向け。
+        Admin SDKにはクライアントキャッシュがないため、プロセス内で保持する。
+
+        Args:
+            user_id: Firebase Auth uid
+            ttl: キャッシュの有効期間（秒）
+
+        Returns:
+            ユーザードキュメントのデータ
+        """
+        now = time.monotonic()
+        cached = self._user_cache.get(user_id)
+        if cached is not None and now - cached[0] < ttl:
+            self._user_cache.move_to_end(user_id)
+            return cached[1]
+
+        user = await self.get_or_create_user(user_id)
+        self._user_cache[user_id] = (now, user)
+        self._user_cache.move_to_end(user_id)
+        while len(self._user_cache) > USER_CACHE_MAX_SIZE:
+            self._user_cache.popitem(last=False)
+        return user
 
     # ========================================
     # 査定履歴管理
@@ -195,13 +368,11 @@ class FirestoreClient:
         search_result: Optional[dict],
         price_result: Optional[dict],
     ) -> TerminationPoint:
-        """エージェントの終了ポイントを判定"""
+        """エージェントの終了ポイントを判定（Vision → Search → Price の順に優先）"""
         if vision_result:
-            category = vision_result.get("category_type")
-            if category == "prohibited":
-                return "vision_prohibited"
-            if category == "unknown":
-                return "vision_unknown"
+            point = _VISION_TERMINATION.get(vision_result.get("category_type"))
+            if point:
+                return point
 
         if search_result:
             classification = search_result.get("analysis", {}).get("classification")
@@ -209,10 +380,7 @@ class FirestoreClient:
                 return "search_unique"
 
         if price_result:
-            status = price_result.get("status")
-            if status == "complete":
-                return "price_complete"
-            return "price_error"
+            return _PRICE_TERMINATION.get(price_result.get("status"), "price_error")
 
         return "vision_unknown"  # フォールバック
 
@@ -221,13 +389,7 @@ class FirestoreClient:
         termination_point: TerminationPoint,
     ) -> OverallStatus:
         """全体ステータスを判定"""
-        if termination_point in ("price_complete", "search_unique"):
-            return "completed"
-        if termination_point == "price_error":
-            return "error"
-        if termination_point in ("vision_prohibited", "vision_unknown"):
-            return "incomplete"
-        return "incomplete"
+        return _OVERALL_STATUS.get(termination_point, "incomplete")
 
     async def save_appraisal(
         self,
@@ -238,6 +400,7 @@ class FirestoreClient:
         image_path: Optional[str] = None,
         user_comment: Optional[str] = None,
         appraisal_id: Optional[str] = None,
+        ensure_user: bool = True,
     ) -> str:
         """
         査定結果をFirestoreに保存
@@ -250,6 +413,10 @@ class FirestoreClient:
             image_path: Cloud Storage上の画像パス（オプション）
             user_comment: ユーザーからの補足コメント（オプション）
             appraisal_id: 査定ID（指定しない場合は自動生成）
+            ensure_user: Trueの場合、ユーザードキュメントをmerge書き込みで更新し、
+                未作成でも同じCommitで作成する
+                （事前の get_or_create_user を待たなくてよい）。
+                created_at などの初期値は get_or_create_user が補完する
 
         Returns:
             作成された査定ドキュメントのID
@@ -265,7 +432,7 @@ class FirestoreClient:
         )
         overall_status = self._determine_overall_status(termination_point)
 
-        # ドキュメント構築
+        # ドキュメント構築（各ノード結果は model_dump 済みのdict）
         appraisal_doc: dict[str, Any] = {
             "id": appraisal_id,
             "created_at": firestore.SERVER_TIMESTAMP,
@@ -282,36 +449,38 @@ class FirestoreClient:
 
         # Vision Node結果
         if vision_result:
+            vision_get = vision_result.get
             appraisal_doc["vision"] = {
-                "category_type": vision_result.get("category_type"),
-                "item_name": vision_result.get("item_name"),
-                "visual_features": vision_result.get("visual_features", []),
-                "confidence": vision_result.get("confidence"),
-                "reasoning": vision_result.get("reasoning"),
-                "retry_advice": vision_result.get("retry_advice"),
+                "category_type": vision_get("category_type"),
+                "item_name": vision_get("item_name"),
+                "visual_features": vision_get("visual_features", []),
+                "confidence": vision_get("confidence"),
+                "reasoning": vision_get("reasoning"),
+                "retry_advice": vision_get("retry_advice"),
             }
 
         # Search Node結果
         if search_result:
-            analysis = search_result.get("analysis", {})
+            analysis_get = (search_result.get("analysis") or {}).get
             appraisal_doc["search"] = {
-                "classification": analysis.get("classification"),
-                "confidence": analysis.get("confidence"),
-                "reasoning": analysis.get("reasoning"),
-                "identified_product": analysis.get("identified_product"),
+                "classification": analysis_get("classification"),
+                "confidence": analysis_get("confidence"),
+                "reasoning": analysis_get("reasoning"),
+                "identified_product": analysis_get("identified_product"),
             }
 
         # Price Node結果
         if price_result:
-            valuation = price_result.get("valuation", {})
+            price_get = price_result.get
+            valuation_get = (price_get("valuation") or {}).get
             appraisal_doc["price"] = {
-                "status": price_result.get("status"),
-                "min_price": valuation.get("min_price", 0),
-                "max_price": valuation.get("max_price", 0),
-                "currency": valuation.get("currency", "JPY"),
-                "confidence": valuation.get("confidence"),
-                "display_message": price_result.get("display_message"),
-                "price_factors": price_result.get("price_factors"),
+                "status": price_get("status"),
+                "min_price": valuation_get("min_price", 0),
+                "max_price": valuation_get("max_price", 0),
+                "currency": valuation_get("currency", "JPY"),
+                "confidence": valuation_get("confidence"),
+                "display_message": price_get("display_message"),
+                "price_factors": price_get("price_factors"),
             }
 
         # 一点物の場合の追加情報（将来の再査定フロー用）
@@ -321,72 +490,174 @@ class FirestoreClient:
                 "expert_request_status": "none",
             }
 
-        # トランザクションで保存 + カウンター更新
+        # 査定履歴の保存 + カウンター更新
         user_ref = self.db.collection("users").document(user_id)
         appraisal_ref = user_ref.collection("appraisals").document(appraisal_id)
-
-        @firestore.transactional
-        def save_in_transaction(transaction):
-            # 査定履歴を保存
-            transaction.set(appraisal_ref, appraisal_doc)
+        user_update = {
             # ユーザーの総査定回数をインクリメント
-            transaction.update(user_ref, {
-                "total_appraisals": firestore.Increment(1),
-                "last_active_at": firestore.SERVER_TIMESTAMP,
-            })
+            "total_appraisals": firestore.Increment(1),
+            "last_active_at": firestore.SERVER_TIMESTAMP,
+        }
+        if ensure_user:
+            user_update["uid"] = user_id
+
+        if settings.FIRESTORE_TRANSACTIONAL_SAVE:
+
+            @firestore.transactional
+            def save_in_transaction(transaction):
+                transaction.set(appraisal_ref, appraisal_doc)
+                if ensure_user:
+                    transaction.set(user_ref, user_update, merge=True)
+                else:
+                    transaction.update(user_ref, user_update)
+
+            transaction = self.db.transaction()
+            await asyncio.to_thread(save_in_transaction, transaction)
+        else:
+            # 2つの書き込みは別ドキュメントで、カウンターはサーバー側の Increment のため
+            # 競合しない。バッチなら1回のCommitで済む
+            batch = self.db.batch()
+            batch.set(appraisal_ref, appraisal_doc)
+            if ensure_user:
+                batch.set(user_ref, user_update, merge=True)
+            else:
+                batch.update(user_ref, user_update)
+            await asyncio.to_thread(batch.commit)
+
+        # total_appraisals が変わったのでキャッシュを破棄
+        self._user_cache.pop(user_id, None)
+        self._invalidate_doc("users", user_id)
+        self._invalidate_doc(f"users/{user_id}/appraisals", appraisal_id)
+
+        self._logger.info(
+            "Saved appraisal: users/%s/appraisals/%s", user_id, appraisal_id
+        )
+        return appraisal_id
 
-        transaction = self.db.transaction()
-        save_in_transaction(transaction)
+    async def _add_image_urls(
+        self, appraisals: list[dict[str, Any]]
+    ) -> list[dict[str, Any]]:
+        """
+        image_pathを持つ査定データに署名付きURLを追加
 
-        self._logger.info(f"Saved appraisal: users/{user_id}/appraisals/{appraisal_id}")
-        return appraisal_id
+        署名は1件ごとに通信・署名処理が発生するため、スレッドで並行実行する。
+        """
+        targets = [a for a in appraisals if a.get("image_path")]
+        urls = await asyncio.gather(
+            *(
+                asyncio.to_thread(storage_client.get_signed_url, a["image_path"])
+                for a in targets
+            ),
+            return_exceptions=True,
+        )
+        for appraisal, url in zip(targets, urls, strict=True):
+            if isinstance(url, BaseException):
+                self._logger.warning("Failed to generate signed URL: %s", url)
+            else:
+                appraisal["image_url"] = url
+        return appraisals
+
+    @staticmethod
+    def _encode_history_cursor(
+        appraisal: dict[str, Any], appraisal_id: str
+    ) -> Optional[str]:
+        """
+        ページ末尾の査定の created_at とドキュメントIDから
+        次ページ用のカーソル文字列を作る
 
-    def _add_image_url(self, appraisal: dict[str, Any]) -> dict[str, Any]:
+        created_at が同じ査定が複数あってもページ境界で重複・欠落しないよう、
+        並び順の同点判定に使うドキュメントIDもカーソルに含める。
         """
-        査定データにimage_pathがあれば署名付きURLを追加
+        created_at = appraisal.get("created_at")
+        if not isinstance(created_at, datetime):
+            return None
+        raw = f"{created_at.isoformat()}{_HISTORY_CURSOR_SEP}{appraisal_id}"
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    @staticmethod
+    def _decode_history_cursor(cursor: str) -> list[Any]:
         """
-        if appraisal.get("image_path"):
-            try:
-                appraisal["image_url"] = storage_client.get_signed_url(
-                    appraisal["image_path"]
-                )
-            except Exception as e:
-                self._logger.warning(f"Failed to generate signed URL: {e}")
-        return appraisal
+        カーソル文字列を start_after に渡す値（created_at, ドキュメントID）に戻す
+
+        ドキュメントIDを含まない旧形式のカーソルは created_at のみを返す。
+
+        Raises:
+            ValueError: カーソルの形式が不正な場合
+        """
+        try:
+            raw = base64.urlsafe_b64decode(cursor).decode()
+        except (binascii.Error, UnicodeDecodeError) as e:
+            raise ValueError(f"Invalid cursor: {cursor}") from e
+        created_at, sep, appraisal_id = raw.partition(_HISTORY_CURSOR_SEP)
+        values: list[Any] = [datetime.fromisoformat(created_at)]
+        if sep:
+            if not appraisal_id or "/" in appraisal_id:
+                raise ValueError(f"Invalid cursor: {cursor}")
+            values.append(appraisal_id)
+        return values
 
     async def get_appraisal_history(
         self,
         user_id: str,
         limit: int = 20,
         offset: int = 0,
-    ) -> list[dict[str, Any]]:
+        cursor: Optional[str] = None,
+        fields: Optional[list[str]] = None,
+    ) -> tuple[list[dict[str, Any]], Optional[str]]:
         """
         ユーザーの査定履歴を取得
 
+        offset はスキップ分もサーバー側で読み取られ課金・遅延が増えるため、
+        2ページ目以降は前ページの next_cursor を渡すこと。
+
         Args:
             user_id: Firebase Auth uid
             limit: 取得件数（デフォルト20）
-            offset: スキップ件数（デフォルト0）
+            offset: スキップ件数（非推奨、後方互換のため残している）
+            cursor: 前ページの next_cursor（指定時は offset より優先）
+            fields: 取得するフィールドパス（一覧表示用に転送量を減らす場合）。
+                カーソルと署名付きURLに必要な created_at, image_path は常に含める
 
         Returns:
-            査定履歴のリスト（新しい順、image_url付き）
+            (査定履歴のリスト（新しい順、image_url付き）, 次ページのカーソル)
+            次ページがない場合、カーソルはNone
+
+        Raises:
+            ValueError: カーソルまたはフィールドパスの形式が不正な場合
         """
-        self._logger.info(f"GET appraisal history: users/{user_id}/appraisals")
+        self._logger.info("GET appraisal history: users/%s/appraisals", user_id)
 
         query = (
             self.db.collection("users")
             .document(user_id)
             .collection("appraisals")
             .order_by("created_at", direction=firestore.Query.DESCENDING)
+            # created_at が同じ査定の並び順を固定する（カーソルの同点判定用）
+            .order_by(FieldPath.document_id(), direction=firestore.Query.DESCENDING)
             .limit(limit)
-            .offset(offset)
         )
-
-        docs = query.stream()
+        if fields:
+            field_paths = dict.fromkeys([*fields, *_HISTORY_REQUIRED_FIELDS])
+            query = query.select(list(field_paths))
+        if cursor:
+            query = query.start_after(self._decode_history_cursor(cursor))
+        elif offset:
+            self._logger.warning(
+                "Offset pagination is deprecated, use cursor instead (offset=%s)",
+                offset,
+            )
+            query = query.offset(offset)
+
+        # 1ページ分をまとめて取得する（1件ずつのストリーミング処理をしない）
+        docs = await asyncio.to_thread(query.get)
         appraisals = [doc.to_dict() for doc in docs]
 
+        next_cursor = None
+        if len(appraisals) == limit:
+            next_cursor = self._encode_history_cursor(appraisals[-1], docs[-1].id)
+
         # 署名付きURLを追加
-        return [self._add_image_url(a) for a in appraisals]
+        return await self._add_image_urls(appraisals), next_cursor
 
     async def get_appraisal(
         self,
@@ -403,20 +674,12 @@ class FirestoreClient:
         Returns:
             査定ドキュメントのデータ（image_url付き）、存在しない場合はNone
         """
-        self._logger.info(f"GET users/{user_id}/appraisals/{appraisal_id}")
-
-        doc = (
-            self.db.collection("users")
-            .document(user_id)
-            .collection("appraisals")
-            .document(appraisal_id)
-            .get()
-        )
-
-        if doc.exists:
-            appraisal = doc.to_dict()
-            return self._add_image_url(appraisal)
-        return None
+        # 履歴一覧から詳細を開くと同じドキュメントを続けて読むため、キャッシュを通す
+        appraisal = await self.get_document(f"users/{user_id}/appraisals", appraisal_id)
+        if appraisal is None:
+            return None
+        appraisals = await self._add_image_urls([appraisal])
+        return appraisals[0]
 
 
 # シングルトンインスタンス
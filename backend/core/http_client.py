@@ -0,0 +1,47 @@
+"""
+共有HTTPクライアントモジュール
+
+SerpApi・Cloud Storage など外部APIへの非同期HTTP呼び出しで
+1つの接続プール（HTTP/2）を共有する。タイムアウトは呼び出し側でリクエストごとに指定する。
+"""
+
+from typing import Optional
+
+import httpx
+
+from core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# 接続プールの上限（全ホスト合計）と、維持するkeep-alive接続数
+HTTP_MAX_CONNECTIONS = 100
+HTTP_MAX_KEEPALIVE = 50
+# リクエストごとに指定しない場合のタイムアウト（秒）
+HTTP_DEFAULT_TIMEOUT_SECONDS = 30.0
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """遅延初期化で共有HTTPクライアントを取得"""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            timeout=HTTP_DEFAULT_TIMEOUT_SECONDS,
+            http2=True,
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            ),
+        )
+        logger.info("Shared HTTP client initialized")
+    return _client
+
+
+async def aclose() -> None:
+    """共有HTTPクライアントを閉じる（アプリ終了時に呼び出す）"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+        logger.info("Shared HTTP client closed")
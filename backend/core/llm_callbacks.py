@@ -4,13 +4,18 @@ LLM呼び出しの自動ログ出力モジュール
 LangChainのCallbacks機能を使用して、LLM呼び出しを自動的にログ出力する。
 """
 
-from typing import Any
+import logging
+from typing import Any, Iterable
 
 from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import BaseMessage, get_buffer_string
 from langchain_core.outputs import LLMResult
 
 from core.logging import get_logger
 
+# DEBUGログに出すプロンプトの最大文字数
+PROMPT_LOG_MAX_CHARS = 200
+
 
 class LLMLoggingHandler(BaseCallbackHandler):
     """LLM呼び出しの自動ログ出力ハンドラー"""
@@ -26,12 +31,39 @@ class LLMLoggingHandler(BaseCallbackHandler):
         **kwargs: Any,
     ) -> None:
         """LLM呼び出し開始時のログ"""
-        model = serialized.get("kwargs", {}).get("model", "unknown")
-        self.logger.info(f"LLM START: model={model}")
+        self._log_start(serialized)
         # プロンプトはDEBUGレベルで出力（長いため）
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self._log_prompts(prompts)
+
+    def on_chat_model_start(
+        self,
+        serialized: dict[str, Any],
+        messages: list[list[BaseMessage]],
+        **kwargs: Any,
+    ) -> None:
+        """
+        チャットモデル呼び出し開始時のログ
+
+        未実装だとLangChainが全メッセージ（Base64画像を含む）を文字列化して
+        on_llm_start に回すため、DEBUG時のみ文字列化するよう自前で処理する。
+        """
+        self._log_start(serialized)
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self._log_prompts(get_buffer_string(m) for m in messages)
+
+    def _log_start(self, serialized: dict[str, Any]) -> None:
+        """呼び出し開始（モデル名）のログ"""
+        model = serialized.get("kwargs", {}).get("model", "unknown")
+        self.logger.info("LLM START: model=%s", model)
+
+    def _log_prompts(self, prompts: Iterable[str]) -> None:
+        """プロンプトを先頭のみに切り詰めてDEBUGログ出力"""
         for i, prompt in enumerate(prompts):
-            truncated = prompt[:200] + "..." if len(prompt) > 200 else prompt
-            self.logger.debug(f"Prompt[{i}]: {truncated}")
+            suffix = "..." if len(prompt) > PROMPT_LOG_MAX_CHARS else ""
+            self.logger.debug(
+                "Prompt[%s]: %s%s", i, prompt[:PROMPT_LOG_MAX_CHARS], suffix
+            )
 
     def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
         """LLM呼び出し終了時のログ"""
@@ -40,15 +72,16 @@ class LLMLoggingHandler(BaseCallbackHandler):
         usage = llm_output.get("token_usage", {})
         if usage:
             self.logger.info(
-                f"LLM END: input={usage.get('prompt_tokens')}, "
-                f"output={usage.get('completion_tokens')}"
+                "LLM END: input=%s, output=%s",
+                usage.get("prompt_tokens"),
+                usage.get("completion_tokens"),
             )
         else:
             self.logger.info("LLM END")
 
     def on_llm_error(self, error: BaseException, **kwargs: Any) -> None:
         """LLMエラー時のログ"""
-        self.logger.error(f"LLM ERROR: {error}", exc_info=True)
+        self.logger.error("LLM ERROR: %s", error, exc_info=True)
 
 
 def get_llm_callbacks(node_name: str) -> list[BaseCallbackHandler]:
@@ -5,15 +5,31 @@
 """
 import logging
 import sys
-import json
-from datetime import datetime, timezone
+import time
 from typing import Any
 
+import orjson
+
+# get_logger で取得済みのロガー（名前 -> ロガー）
+_logger_cache: dict[str, logging.Logger] = {}
+
+# Cloud Logging のソース位置フィールド名
+_SOURCE_LOCATION_KEY = "logging.googleapis.com/sourceLocation"
+
+
+def _format_utc_timestamp(created: float) -> str:
+    """LogRecord.created（UNIX時刻）をRFC 3339形式のUTC文字列に変換"""
+    seconds = int(created)
+    micros = int((created - seconds) * 1_000_000)
+    return f"{time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(seconds))}.{micros:06d}Z"
+
 
 class CloudLoggingFormatter(logging.Formatter):
     """
     Cloud Logging互換のJSON形式フォーマッター
     ローカル開発時は人間可読形式、本番はJSON形式
+
+    時刻はレコード生成時に記録済みの record.created を使い、現在時刻を取り直さない。
     """
 
     def __init__(self, json_format: bool = False):
@@ -26,8 +42,8 @@ class CloudLoggingFormatter(logging.Formatter):
             log_entry: dict[str, Any] = {
                 "severity": record.levelname,
                 "message": record.getMessage(),
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-                "logging.googleapis.com/sourceLocation": {
+                "timestamp": _format_utc_timestamp(record.created),
+                _SOURCE_LOCATION_KEY: {
                     "file": record.filename,
                     "line": record.lineno,
                     "function": record.funcName,
@@ -36,10 +52,12 @@ class CloudLoggingFormatter(logging.Formatter):
             }
             if record.exc_info:
                 log_entry["exception"] = self.formatException(record.exc_info)
-            return json.dumps(log_entry, ensure_ascii=False)
+            return orjson.dumps(log_entry).decode()
         else:
             # ローカル開発用の人間可読形式
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            timestamp = time.strftime(
+                "%Y-%m-%d %H:%M:%S", time.localtime(record.created)
+            )
             return f"{timestamp} [{record.levelname}] {record.name}: {record.getMessage()}"
 
 
@@ -81,5 +99,10 @@ def get_logger(name: str) -> logging.Logger:
         from core.logging import get_logger
         logger = get_logger(__name__)
         logger.info("Processing started")
+
+    取得済みのロガーはモジュール内の辞書から返し、logging のロックを経由しない。
     """
-    return logging.getLogger(name)
+    logger = _logger_cache.get(name)
+    if logger is None:
+        logger = _logger_cache.setdefault(name, logging.getLogger(name))
+    return logger
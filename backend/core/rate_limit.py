@@ -0,0 +1,62 @@
+"""
+外部APIのレート制限モジュール
+
+プロバイダーのクォータ（1秒あたりのリクエスト数）を超えないよう、
+呼び出しの開始タイミングを平準化する。429によるリトライの連鎖を避けるため。
+"""
+
+import asyncio
+import time
+
+from core.config import settings
+
+
+class AsyncRateLimiter:
+    """
+    トークンバケット方式のレート制限
+
+    max_rate 件/秒 までの呼び出しを許可し、超過分は待機させる
+    （バーストは max_rate 件まで）。
+    同時実行数は制限しないため、呼び出しの開始間隔だけを調整する。
+    max_rate が0以下の場合は制限しない。
+
+    使い方:
+        async with limiter:
+            await call_api()
+    """
+
+    def __init__(self, max_rate: float):
+        self.max_rate = max_rate
+        self._tokens = max_rate
+        self._updated_at = time.monotonic()
+        # 待機中の呼び出しを到着順に通す
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """呼び出し枠を1つ確保する（空きがなければ補充されるまで待機）"""
+        if self.max_rate <= 0:
+            return
+
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.max_rate,
+                    self._tokens + (now - self._updated_at) * self.max_rate,
+                )
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.max_rate)
+
+    async def __aenter__(self) -> None:
+        await self.acquire()
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        return None
+
+
+# プロバイダーごとのシングルトン（設定値が0なら無制限）
+gemini_limiter = AsyncRateLimiter(settings.GEMINI_MAX_RPS)
+serpapi_limiter = AsyncRateLimiter(settings.SERPAPI_MAX_RPS)
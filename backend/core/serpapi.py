@@ -1,22 +1,67 @@
 """SerpApi Google Lens クライアント"""
 
 import asyncio
-from typing import Optional
+import random
 
 import httpx
+import orjson
 
 from core.config import settings
+from core.http_client import get_http_client
 from core.logging import get_logger
-from features.agent.vision.serpapi_schema import (
-    GoogleLensResponse,
-    GoogleLensVisualMatch,
-    GoogleLensKnowledgeGraph,
-)
+from core.rate_limit import serpapi_limiter
+from features.agent.vision.serpapi_schema import GoogleLensResponse
 
 logger = get_logger(__name__)
 
 SERPAPI_BASE_URL = "https://serpapi.com/search"
 
+# SerpApi側でレスポンスを絞り込む JSON Restrictor（パースで使うフィールドのみ返させる）
+LENS_JSON_RESTRICTOR = ",".join(
+    [
+        "search_metadata.status",
+        "error",
+        "visual_matches[].{position,title,link,source,price,thumbnail,in_stock}",
+        "knowledge_graph",
+        "related_content[].query",
+    ]
+)
+
+# リトライ待機時間（指数バックオフ + フルジッター）の基準値と上限（秒）
+RETRY_BASE_DELAY = 0.1
+RETRY_MAX_DELAY = 2.0
+
+
+async def _backoff(attempt: int) -> None:
+    """
+    リトライ前の待機
+
+    待機時間を指数的に伸ばしつつランダム化し、一斉リトライによる負荷集中を避ける。
+    """
+    delay = random.uniform(0, min(RETRY_BASE_DELAY * 2**attempt, RETRY_MAX_DELAY))
+    await asyncio.sleep(delay)
+
+
+def _to_visual_match(match: dict) -> dict:
+    """
+    visual_matches の1要素をモデルの入力形式に変換
+
+    検証はレスポンス全体の model_validate でまとめて行う。
+    必須項目が null の場合は既定値で埋める。
+    """
+    price = match.get("price")
+    if isinstance(price, dict):
+        price = price.get("value")
+    return {
+        "position": match.get("position") or 0,
+        "title": match.get("title") or "",
+        "link": match.get("link"),
+        "source": match.get("source"),
+        "price": price,
+        "thumbnail": match.get("thumbnail"),
+        "in_stock": match.get("in_stock"),
+    }
+
 
 class SerpApiError(Exception):
     """SerpApi関連のエラー"""
@@ -31,6 +76,11 @@ class SerpApiClient:
         self.api_key = settings.SERPAPI_API_KEY
         self.timeout = settings.SERPAPI_TIMEOUT_SECONDS
 
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """共有HTTPクライアント（接続プール・HTTP/2をCloud Storageと共有する）"""
+        return get_http_client()
+
     async def search_by_image_url(
         self,
         image_url: str,
@@ -63,57 +113,61 @@ class SerpApiClient:
             "api_key": self.api_key,
             "hl": language,
             "country": country,
+            "json_restrictor": LENS_JSON_RESTRICTOR,
         }
 
-        logger.info(f"SerpApi Google Lens search: type={search_type}")
+        logger.info("SerpApi Google Lens search: type=%s", search_type)
 
         max_retries = 2
         last_error_message = ""
 
         for attempt in range(max_retries + 1):
             try:
-                async with httpx.AsyncClient(timeout=self.timeout) as client:
-                    response = await client.get(SERPAPI_BASE_URL, params=params)
-
-                    if response.status_code != 200:
-                        if (
-                            response.status_code in (502, 503, 504)
-                            and attempt < max_retries
-                        ):
-                            logger.warning(
-                                f"SerpApi HTTP {response.status_code}, retrying ({attempt + 1}/{max_retries})"
-                            )
-                            await asyncio.sleep(1)
-                            continue
-                        logger.error(f"SerpApi HTTP error: {response.status_code}")
-                        return GoogleLensResponse(
-                            status="Error",
-                            error_message=f"HTTP error: {response.status_code}",
+                async with serpapi_limiter:
+                    response = await self.client.get(
+                        SERPAPI_BASE_URL, params=params, timeout=self.timeout
+                    )
+
+                if response.status_code != 200:
+                    if (
+                        response.status_code in (502, 503, 504)
+                        and attempt < max_retries
+                    ):
+                        logger.warning(
+                            "SerpApi HTTP %s, retrying (%s/%s)",
+                            response.status_code,
+                            attempt + 1,
+                            max_retries,
                         )
+                        await _backoff(attempt)
+                        continue
+                    logger.error("SerpApi HTTP error: %s", response.status_code)
+                    return GoogleLensResponse(
+                        status="Error",
+                        error_message=f"HTTP error: {response.status_code}",
+                    )
 
-                    data = response.json()
-                    return self._parse_response(data)
+                data = orjson.loads(response.content)
+                return self._parse_response(data)
 
-            except httpx.TimeoutException:
-                last_error_message = "Request timed out"
-                if attempt < max_retries:
-                    logger.warning(
-                        f"SerpApi timeout, retrying ({attempt + 1}/{max_retries})"
-                    )
-                    await asyncio.sleep(1)
-                    continue
-                logger.error("SerpApi request timed out after retries")
             except httpx.RequestError as e:
-                last_error_message = f"Request error: {str(e)}"
+                # タイムアウト（TimeoutException）も RequestError のサブクラス
+                if isinstance(e, httpx.TimeoutException):
+                    last_error_message = "Request timed out"
+                else:
+                    last_error_message = f"Request error: {str(e)}"
                 if attempt < max_retries:
                     logger.warning(
-                        f"SerpApi request error, retrying ({attempt + 1}/{max_retries}): {e}"
+                        "SerpApi %s, retrying (%s/%s)",
+                        last_error_message,
+                        attempt + 1,
+                        max_retries,
                     )
-                    await asyncio.sleep(1)
+                    await _backoff(attempt)
                     continue
-                logger.error(f"SerpApi request error after retries: {e}")
+                logger.error("SerpApi %s after retries", last_error_message)
             except Exception as e:
-                logger.error(f"SerpApi unexpected error: {e}", exc_info=True)
+                logger.error("SerpApi unexpected error: %s", e, exc_info=True)
                 return GoogleLensResponse(
                     status="Error",
                     error_message=f"Unexpected error: {str(e)}",
@@ -136,49 +190,43 @@ class SerpApiClient:
             )
 
         # visual_matchesをパース
-        visual_matches = []
-        for match in data.get("visual_matches", []):
-            visual_matches.append(
-                GoogleLensVisualMatch(
-                    position=match.get("position", 0),
-                    title=match.get("title", ""),
-                    link=match.get("link"),
-                    source=match.get("source"),
-                    price=match.get("price", {}).get("value")
-                    if isinstance(match.get("price"), dict)
-                    else match.get("price"),
-                    thumbnail=match.get("thumbnail"),
-                    in_stock=match.get("in_stock"),
-                )
-            )
+        visual_matches = [
+            _to_visual_match(match) for match in data.get("visual_matches", [])
+        ]
 
         # knowledge_graphをパース
         knowledge_graph = None
         kg_data = data.get("knowledge_graph")
         if kg_data:
-            knowledge_graph = GoogleLensKnowledgeGraph(
-                title=kg_data.get("title"),
-                subtitle=kg_data.get("subtitle"),
-                description=kg_data.get("description"),
-                images=kg_data.get("images", []),
-            )
+            knowledge_graph = {
+                "title": kg_data.get("title"),
+                "subtitle": kg_data.get("subtitle"),
+                "description": kg_data.get("description"),
+                "images": kg_data.get("images", []),
+            }
 
         # related_contentからクエリを抽出
-        related_queries = []
-        for item in data.get("related_content", []):
-            if query := item.get("query"):
-                related_queries.append(query)
+        related_queries = [
+            query
+            for item in data.get("related_content", [])
+            if isinstance(query := item.get("query"), str) and query
+        ]
 
         logger.info(
-            f"SerpApi parsed: {len(visual_matches)} visual_matches, "
-            f"knowledge_graph={'yes' if knowledge_graph else 'no'}"
+            "SerpApi parsed: %s visual_matches, knowledge_graph=%s",
+            len(visual_matches),
+            "yes" if knowledge_graph else "no",
         )
 
-        return GoogleLensResponse(
-            status="Success",
-            visual_matches=visual_matches,
-            knowledge_graph=knowledge_graph,
-            related_queries=related_queries,
+        # 件数の多い visual_matches を1件ずつモデル化せず、全体を1回の model_validate で
+        # 検証・構築する（形式が不正なレスポンスはここで ValidationError になる）
+        return GoogleLensResponse.model_validate(
+            {
+                "status": "Success",
+                "visual_matches": visual_matches,
+                "knowledge_graph": knowledge_graph,
+                "related_queries": related_queries,
+            }
         )
 
 
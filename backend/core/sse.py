@@ -0,0 +1,66 @@
+"""
+SSE (Server-Sent Events) フォーマットモジュール
+
+エージェント（プロデューサー）とAPI（コンシューマー）の両方から使うため、
+イベントをSSEのdata行（UTF-8バイト列）に変換する処理をここにまとめる。
+"""
+import time
+from typing import Optional
+
+import orjson
+
+# イベント種別ごとに、SSEの message に載せるフィールド名
+_MESSAGE_FIELD = {
+    "thinking": "content",
+    "node_start": "message",
+    "error": "message",
+}
+
+
+def now_ms() -> int:
+    """現在時刻（UNIXエポックからのミリ秒）。floatを経由しない整数演算のみ"""
+    return time.time_ns() // 1_000_000
+
+
+def encode_sse(payload: dict) -> bytes:
+    """SSEのdata行をUTF-8バイト列として構築（orjsonは直接bytesを返す）"""
+    return b"data: " + orjson.dumps(payload) + b"\n\n"
+
+
+def encode_sse_complete(result_json: bytes) -> bytes:
+    """
+    complete イベントのdata行を構築
+
+    result_json はシリアライズ済みのJSON（model_dump_json の結果）をそのまま埋め込み、
+    中間のPython dictを作らない。
+    """
+    return (
+        b'data: {"type":"complete","result":'
+        + result_json
+        + b',"timestamp":'
+        + str(now_ms()).encode()
+        + b"}\n\n"
+    )
+
+
+def format_sse(event: dict) -> Optional[bytes]:
+    """
+    エージェントのイベントをSSEのdata行に変換
+
+    node_complete はクライアントに送信不要（表示情報なし）のため None を返す。
+    """
+    event_type = event.get("type")
+    if event_type == "node_complete":
+        return None
+
+    sse_event = {
+        "type": event_type,
+        "node": event.get("node"),
+        "timestamp": now_ms(),
+    }
+
+    field = _MESSAGE_FIELD.get(event_type)
+    if field:
+        sse_event["message"] = event.get(field, "")
+
+    return encode_sse(sse_event)
@@ -3,40 +3,171 @@ Cloud Storageクライアントモジュール
 
 商品画像のアップロード・取得を担当。
 """
-import base64
+import asyncio
+import binascii
 import io
 import re
-from datetime import timedelta
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
 from typing import Optional
+from urllib.parse import quote
 
 import google.auth
+import httpx
 from google.auth.transport import requests as auth_requests
 from google.cloud import storage
-from PIL import Image
+from PIL import ExifTags, Image, ImageOps
+from requests.adapters import HTTPAdapter
 
 from core.config import settings
+from core.http_client import get_http_client
 from core.logging import get_logger
 
 
 logger = get_logger(__name__)
 
+# Cloud Storage へのHTTPコネクションプールの上限（同時リクエスト数に合わせる）
+HTTP_POOL_MAXSIZE = 20
+
+# Cloud Storage API のエンドポイント（アップロード・削除は非同期HTTPで直接呼ぶ）
+# アップロードはメタデータ（Cache-Control等）をヘッダーで指定できるXML APIを使う
+GCS_API_URL = "https://storage.googleapis.com/storage/v1"
+GCS_XML_API_URL = "https://storage.googleapis.com"
+GCS_HTTP_TIMEOUT_SECONDS = 30.0
+
+# 署名用アクセストークンを更新する、有効期限までの残り時間（秒）
+SIGNING_TOKEN_REFRESH_MARGIN_SECONDS = 300
+
+# 署名付きURLキャッシュの上限件数と、有効期限のうち再利用する割合
+SIGNED_URL_CACHE_MAX_SIZE = 10_000
+SIGNED_URL_REUSE_RATIO = 0.8
+
+# SerpApi用一時画像のCache-Control（署名付きURLの有効期間内のリトライ向け）
+SERPAPI_TEMP_CACHE_CONTROL = "private, max-age=60"
+
+# 画像形式の拡張子（Content-Type -> 拡張子、判別できない形式は .bin）
+_IMAGE_EXTENSIONS = {"image/jpeg": "jpg", "image/png": "png", "image/webp": "webp"}
+
+# 回転・反転が必要なEXIF orientationの値（1は正位置）
+_EXIF_TRANSPOSE_ORIENTATIONS = frozenset(range(2, 9))
+
+# Data URIのヘッダー（data:image/png;base64,）と、その探索範囲の上限（文字数）
+_DATA_URI_HEADER_RE = re.compile(r"data:image/[^;,]+;base64,")
+DATA_URI_HEADER_MAX_LENGTH = 64
+
+
+def _user_image_path(user_id: str, appraisal_id: str, content_type: str) -> str:
+    """査定画像の保存先パス（拡張子は保存形式に合わせる）"""
+    return f"users/{user_id}/{appraisal_id}.{_IMAGE_EXTENSIONS[content_type]}"
+
+
+def _token_expiring(credentials) -> bool:
+    """アクセストークンが未取得、または有効期限が近いかを判定"""
+    expiry = credentials.expiry  # naive UTC
+    if credentials.token is None or expiry is None:
+        return True
+    refresh_at = datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(
+        seconds=SIGNING_TOKEN_REFRESH_MARGIN_SECONDS
+    )
+    return expiry <= refresh_at
+
+
+def decode_base64_image(image_base64: str) -> bytes:
+    """
+    Base64画像をデコード
+
+    data:image/png;base64,... 形式とプレーンBase64の両方に対応
+    """
+    # Data URI形式の場合はプレフィックスを除去
+    # 正規表現で本体をキャプチャすると数MBの文字列がもう一度作られるため、
+    # ヘッダー部分だけを照合し、カンマ以降をスライスする
+    if image_base64.startswith("data:"):
+        comma = image_base64.find(",", 0, DATA_URI_HEADER_MAX_LENGTH)
+        if comma != -1 and _DATA_URI_HEADER_RE.match(image_base64, 0, comma + 1):
+            image_base64 = image_base64[comma + 1 :]
+
+    # base64.b64decode はstrを一度ASCIIバイト列へコピーしてから変換するため、
+    # strをそのまま受け付ける binascii.a2b_base64 を直接使う（数MBのコピーを省く）
+    return binascii.a2b_base64(image_base64)
+
+
+def sniff_image_mime(data: bytes) -> str:
+    """
+    先頭バイト（マジックナンバー）から画像のMIMEタイプを判定
+
+    JPEG・PNG・WebP以外は application/octet-stream を返す。
+    """
+    if data[:3] == b"\xff\xd8\xff":
+        return "image/jpeg"
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        return "image/png"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return "application/octet-stream"
+
 
 class StorageClient:
-    """Cloud Storageクライアントのラッパー"""
+    """
+    Cloud Storageクライアントのラッパー
+
+    HTTPセッションを使い回すため、モジュール末尾のシングルトン
+    storage_client を使うこと。
+    """
 
     def __init__(self):
         self._client: Optional[storage.Client] = None
         self._bucket: Optional[storage.Bucket] = None
+        self._credentials = None
+        self._credentials_lock = threading.Lock()
         self._signing_credentials = None
+        self._signing_lock = threading.Lock()
+        # (画像パス, 有効期限（分）) -> (再利用期限, 署名付きURL)
+        # get_signed_url はワーカースレッドから呼ばれるためロックで保護する
+        self._url_cache: OrderedDict[tuple[str, int], tuple[float, str]] = OrderedDict()
+        self._url_cache_lock = threading.Lock()
 
     @property
     def client(self) -> storage.Client:
         """遅延初期化でStorageクライアント取得"""
         if self._client is None:
-            self._client = storage.Client()
+            credentials, project = google.auth.default(scopes=storage.Client.SCOPE)
+            self._credentials = credentials
+            # 接続を使い回せるよう、プールを広げた共有セッションを使う
+            session = auth_requests.AuthorizedSession(credentials)
+            adapter = HTTPAdapter(
+                pool_connections=HTTP_POOL_MAXSIZE,
+                pool_maxsize=HTTP_POOL_MAXSIZE,
+            )
+            session.mount("https://", adapter)
+            self._client = storage.Client(
+                project=project,
+                credentials=credentials,
+                _http=session,
+            )
             logger.info("Cloud Storage client initialized")
         return self._client
 
+    @property
+    def http(self) -> httpx.AsyncClient:
+        """
+        非同期HTTPクライアント（接続プール・HTTP/2をSerpApiと共有する）
+
+        アップロード・削除は Cloud Storage API を直接呼び、
+        ワーカースレッドを占有しないようにする。
+        """
+        return get_http_client()
+
+    async def close(self) -> None:
+        """HTTPセッションを閉じる（アプリ終了時に呼び出す）"""
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+            self._bucket = None
+            logger.info("Cloud Storage client closed")
+
     @property
     def bucket(self) -> storage.Bucket:
         """バケット参照を取得"""
@@ -45,87 +176,261 @@ class StorageClient:
             logger.info(f"Using bucket: {settings.GCS_BUCKET_NAME}")
         return self._bucket
 
+    def _refresh_credentials(self) -> None:
+        """Storage用の認証情報を初期化し、アクセストークンを更新（期限が近い場合のみ）"""
+        with self._credentials_lock:
+            if self._credentials is None:
+                _ = self.client  # 認証情報はクライアント初期化時に取得される
+            if _token_expiring(self._credentials):
+                self._credentials.refresh(auth_requests.Request())
+
+    async def _auth_headers(self) -> dict[str, str]:
+        """
+        Cloud Storage API 呼び出し用の認証ヘッダーを返す
+
+        初期化・トークン更新時のみスレッドで通信する。
+        """
+        if self._credentials is None or _token_expiring(self._credentials):
+            await asyncio.to_thread(self._refresh_credentials)
+        return {"Authorization": f"Bearer {self._credentials.token}"}
+
+    async def _upload_bytes(
+        self,
+        path: str,
+        data: bytes,
+        content_type: str,
+        cache_control: Optional[str] = None,
+    ) -> None:
+        """バイト列をオブジェクトとしてアップロード（XML API の PUT Object）"""
+        headers = await self._auth_headers()
+        headers["Content-Type"] = content_type
+        if cache_control:
+            headers["Cache-Control"] = cache_control
+        response = await self.http.put(
+            f"{GCS_XML_API_URL}/{settings.GCS_BUCKET_NAME}/{quote(path)}",
+            content=data,
+            headers=headers,
+            timeout=GCS_HTTP_TIMEOUT_SECONDS,
+        )
+        response.raise_for_status()
+
+    async def _delete_object(self, path: str) -> None:
+        """オブジェクトを削除（JSON API）"""
+        headers = await self._auth_headers()
+        response = await self.http.delete(
+            f"{GCS_API_URL}/b/{settings.GCS_BUCKET_NAME}/o/{quote(path, safe='')}",
+            headers=headers,
+            timeout=GCS_HTTP_TIMEOUT_SECONDS,
+        )
+        response.raise_for_status()
+
+    async def _object_exists(self, path: str) -> bool:
+        """オブジェクトの存在確認（JSON API のメタデータ取得）"""
+        headers = await self._auth_headers()
+        response = await self.http.get(
+            f"{GCS_API_URL}/b/{settings.GCS_BUCKET_NAME}/o/{quote(path, safe='')}",
+            params={"fields": "name"},
+            headers=headers,
+            timeout=GCS_HTTP_TIMEOUT_SECONDS,
+        )
+        if response.status_code == 404:
+            return False
+        response.raise_for_status()
+        return True
+
+    def warmup(self) -> None:
+        """
+        クライアントと認証情報をウォームアップ（起動時にスレッドで呼び出す）
+
+        初回リクエストでStorageクライアント生成（ADC探索）、アクセストークン取得、
+        署名用認証情報の取得がまとめて発生しないよう、起動時に済ませておく。
+        """
+        try:
+            _ = self.bucket
+            self._refresh_credentials()
+            self._get_signing_kwargs()
+        except Exception as e:
+            logger.warning(f"Cloud Storage warmup failed: {e}")
+            return
+
+        logger.info("Cloud Storage client warmed up")
+
     def _get_signing_kwargs(self) -> dict:
-        """Cloud Run環境でIAM署名を使うためのパラメータを返す"""
-        credentials, _ = google.auth.default()
-        if hasattr(credentials, "service_account_email") and hasattr(credentials, "token"):
-            credentials.refresh(auth_requests.Request())
+        """
+        Cloud Run環境でIAM署名を使うためのパラメータを返す
+
+        認証情報はプロセス内で使い回し、アクセストークンは期限が近づいた場合のみ更新する
+        （メタデータサーバーへの問い合わせを毎回行わない）。
+        """
+        with self._signing_lock:
+            credentials = self._signing_credentials
+            if credentials is None:
+                credentials, _ = google.auth.default()
+                self._signing_credentials = credentials
+
+            if not (
+                hasattr(credentials, "service_account_email")
+                and hasattr(credentials, "token")
+            ):
+                return {}
+
+            if _token_expiring(credentials):
+                credentials.refresh(auth_requests.Request())
+
             return {
                 "service_account_email": credentials.service_account_email,
                 "access_token": credentials.token,
             }
-        return {}
 
-    def _decode_base64_image(self, image_base64: str) -> bytes:
+    def _sign_blob(self, blob: storage.Blob, expiration: timedelta) -> str:
+        """GET用の署名付きURLを生成（同期処理のため呼び出し側でスレッド実行する）"""
+        return blob.generate_signed_url(
+            expiration=expiration,
+            method="GET",
+            **self._get_signing_kwargs(),
+        )
+
+    def _passthrough_content_type(
+        self,
+        image_bytes: bytes,
+        img: Image.Image,
+    ) -> Optional[str]:
         """
-        Base64画像をデコード
+        WebP変換を省略してそのまま保存できる画像か判定する
+
+        先頭バイトで形式を判別し、サイズはPILが読んだヘッダーから取得する
+        （ピクセルはデコードしない）。既にWebP、または十分小さいJPEGで、長辺が
+        WEBP_MAX_DIMENSION 以下の場合に Content-Type を返す。変換が必要な場合はNone。
 
-        data:image/png;base64,... 形式とプレーンBase64の両方に対応
+        そのまま保存すると位置情報・機器のシリアル番号などのメタデータが残り、
+        EXIFの回転も適用されないため、EXIFが空（またはOrientation=1のみ）で
+        XMPも持たない画像に限る。
+        """
+        content_type = sniff_image_mime(image_bytes)
+        if content_type == "image/jpeg":
+            if len(image_bytes) > settings.IMAGE_PASSTHROUGH_JPEG_MAX_BYTES:
+                return None
+        elif content_type != "image/webp":
+            return None
+
+        if max(img.size) > settings.WEBP_MAX_DIMENSION:
+            return None
+
+        exif = img.getexif()
+        if any(
+            tag != ExifTags.Base.Orientation or value != 1
+            for tag, value in exif.items()
+        ):
+            return None
+        if "xmp" in img.info or "XML:com.adobe.xmp" in img.info:
+            return None
+        return content_type
+
+    def _prepare_for_storage(self, image_bytes: bytes) -> tuple[bytes, str]:
         """
-        # Data URI形式の場合はプレフィックスを除去
-        if image_base64.startswith("data:"):
-            match = re.match(r"data:image/[^;]+;base64,(.+)", image_base64)
-            if match:
-                image_base64 = match.group(1)
+        保存用の画像データとContent-Typeを返す（CPU処理のためスレッドで呼び出す）
 
-        return base64.b64decode(image_base64)
+        そのまま保存できる画像は再エンコードせず、それ以外はWebPに変換する。
+        形式判定とWebP変換では、ヘッダー解析済みの同じ Image を使い回す。
+        """
+        # bytes から作る BytesIO は元のバッファを共有する（コピーしない）
+        with Image.open(io.BytesIO(image_bytes)) as img:
+            content_type = self._passthrough_content_type(image_bytes, img)
+            if content_type is not None:
+                return image_bytes, content_type
+            return self._encode_webp(img), "image/webp"
 
-    def _convert_to_webp(self, image_bytes: bytes, quality: int = 85) -> bytes:
+    def _encode_webp(
+        self,
+        img: Image.Image,
+        quality: Optional[int] = None,
+    ) -> bytes:
         """
-        画像をWebP形式に変換
+        開いた画像（未デコード）をWebP形式にエンコード
+
+        長辺を WEBP_MAX_DIMENSION に縮小し、エンコード速度を優先した設定で保存する。
 
         Args:
-            image_bytes: 元画像のバイナリデータ
-            quality: 画質（1-100）
+            img: Image.open で開いた画像（呼び出し側で close する）
+            quality: 画質（1-100）、Noneの場合は設定値を使用
 
         Returns:
             WebP形式のバイナリデータ
         """
-        with Image.open(io.BytesIO(image_bytes)) as img:
-            # EXIF orientationに基づいて画像を正しい向きに回転
-            from PIL import ImageOps
-            img = ImageOps.exif_transpose(img)
+        if quality is None:
+            quality = settings.WEBP_QUALITY
 
-            # RGBAの場合はRGBに変換（WebPは透過もサポートするが、写真なので不要）
-            if img.mode in ("RGBA", "P"):
-                img = img.convert("RGB")
+        max_dim = settings.WEBP_MAX_DIMENSION
+        source = img
 
-            output = io.BytesIO()
-            img.save(output, format="WEBP", quality=quality)
-            return output.getvalue()
+        # JPEGはデコード時点でDCTスケーリングにより縮小し、IDCT処理量を減らす
+        # （長辺が max_dim 以上となる範囲で縮小される。JPEG以外は何もしない）
+        img.draft("RGB", (max_dim, max_dim))
+
+        # EXIF orientationに基づいて画像を正しい向きに回転
+        # exif_transpose は回転不要（orientation=1）でも画像全体をコピーするため、
+        # ヘッダーのEXIFを先に確認し、回転・反転が必要な場合のみ呼ぶ
+        orientation = img.getexif().get(ExifTags.Base.Orientation, 1)
+        if orientation in _EXIF_TRANSPOSE_ORIENTATIONS:
+            img = ImageOps.exif_transpose(img)
+
+        # RGBAの場合はRGBに変換（WebPは透過もサポートするが、写真なので不要）
+        if img.mode in ("RGBA", "P"):
+            img = img.convert("RGB")
+
+        # 保存用途では高解像度は不要なため、縮小してエンコード量を減らす
+        img.thumbnail((max_dim, max_dim), Image.Resampling.LANCZOS)
+
+        # 出力バッファはスレッド間で使い回さない（getvalue() は内部バッファを
+        # コピーせずに返すため、再利用すると次の書き込みで結局コピーが発生する）
+        output = io.BytesIO()
+        img.save(
+            output,
+            format="WEBP",
+            quality=quality,
+            method=settings.WEBP_METHOD,
+            lossless=False,
+        )
+        # 変換途中の画像（回転・RGB変換後）をここで解放し、ピークメモリを抑える
+        if img is not source:
+            img.close()
+        return output.getvalue()
 
     async def upload_image(
         self,
         user_id: str,
         appraisal_id: str,
-        image_base64: str,
+        image_bytes: bytes,
     ) -> str:
         """
-        Base64画像をWebP形式でCloud Storageにアップロード
+        画像をCloud Storageにアップロード
+
+        基本はWebPに変換して保存する。既にWebP、または小さいJPEGの場合は
+        再エンコードせずそのまま保存する（拡張子は形式に合わせる）。
 
         Args:
             user_id: ユーザーID
             appraisal_id: 査定ID
-            image_base64: Base64エンコードされた画像
+            image_bytes: デコード済みの画像バイナリ
 
         Returns:
             保存先のパス（gs://bucket/path 形式ではなく、相対パス）
         """
         try:
-            # Base64デコード
-            image_bytes = self._decode_base64_image(image_base64)
-
-            # WebP変換
-            webp_bytes = self._convert_to_webp(image_bytes)
+            # WebP変換（CPU処理のためイベントループを塞がないようスレッドで実行）
+            data, content_type = await asyncio.to_thread(
+                self._prepare_for_storage, image_bytes
+            )
+            # 元画像はアップロード中に保持しない（呼び出し側も参照を手放している）
+            del image_bytes
 
             # アップロード先パス
-            image_path = f"users/{user_id}/{appraisal_id}.webp"
+            image_path = _user_image_path(user_id, appraisal_id, content_type)
 
             # アップロード
-            blob = self.bucket.blob(image_path)
-            blob.upload_from_string(webp_bytes, content_type="image/webp")
+            await self._upload_bytes(image_path, data, content_type)
 
-            logger.info(f"Uploaded image: {image_path} ({len(webp_bytes)} bytes)")
+            logger.info(f"Uploaded image: {image_path} ({len(data)} bytes)")
             return image_path
 
         except Exception as e:
@@ -140,6 +445,8 @@ class StorageClient:
         """
         署名付きURLを生成
 
+        同じ画像の署名付きURLは有効期限の8割が過ぎるまで再利用する（履歴の再読み込み対策）。
+
         Args:
             image_path: 画像のパス
             expiration_minutes: 有効期限（分）、Noneの場合は設定値を使用
@@ -150,12 +457,23 @@ class StorageClient:
         if expiration_minutes is None:
             expiration_minutes = settings.GCS_IMAGE_EXPIRATION_MINUTES
 
+        key = (image_path, expiration_minutes)
+        now = time.monotonic()
+        with self._url_cache_lock:
+            cached = self._url_cache.get(key)
+            if cached is not None and now < cached[0]:
+                self._url_cache.move_to_end(key)
+                return cached[1]
+
         blob = self.bucket.blob(image_path)
-        url = blob.generate_signed_url(
-            expiration=timedelta(minutes=expiration_minutes),
-            method="GET",
-            **self._get_signing_kwargs(),
-        )
+        url = self._sign_blob(blob, timedelta(minutes=expiration_minutes))
+
+        reuse_until = now + expiration_minutes * 60 * SIGNED_URL_REUSE_RATIO
+        with self._url_cache_lock:
+            self._url_cache[key] = (reuse_until, url)
+            self._url_cache.move_to_end(key)
+            while len(self._url_cache) > SIGNED_URL_CACHE_MAX_SIZE:
+                self._url_cache.popitem(last=False)
 
         logger.debug(f"Generated signed URL for: {image_path}")
         return url
@@ -171,49 +489,123 @@ class StorageClient:
             削除成功時はTrue
         """
         try:
-            blob = self.bucket.blob(image_path)
-            blob.delete()
+            await self._delete_object(image_path)
+            with self._url_cache_lock:
+                for key in [k for k in self._url_cache if k[0] == image_path]:
+                    del self._url_cache[key]
             logger.info(f"Deleted image: {image_path}")
             return True
         except Exception as e:
             logger.error(f"Failed to delete image: {e}", exc_info=True)
             return False
 
-    async def upload_temp_image_for_serpapi(
+    async def delete_image_for_appraisal(self, user_id: str, appraisal_id: str) -> None:
+        """
+        査定の保存画像を、保存形式が分からない状態で削除する
+
+        upload_image が完了しなかった場合（キャンセル・失敗）でも、サーバー側で
+        PUTが受理されていれば画像が残るため、形式ごとの候補パスをすべて削除する。
+        存在しないパス（404）は無視する。
+        """
+
+        async def delete(image_path: str) -> None:
+            try:
+                await self._delete_object(image_path)
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code == 404:
+                    return
+                logger.error(f"Failed to delete image: {image_path}: {e}")
+                return
+            except Exception as e:
+                logger.error(f"Failed to delete image: {image_path}: {e}")
+                return
+            logger.info(f"Deleted image: {image_path}")
+
+        await asyncio.gather(
+            *(
+                delete(_user_image_path(user_id, appraisal_id, content_type))
+                for content_type in _IMAGE_EXTENSIONS
+            )
+        )
+
+    def serpapi_temp_path(
+        self,
+        image_bytes: bytes,
+        image_digest: Optional[bytes] = None,
+    ) -> str:
+        """
+        SerpApi用一時画像のオブジェクトパスを返す
+
+        画像のハッシュが渡された場合はハッシュをオブジェクト名にする（省略時はランダム）。
+        拡張子は画像の先頭バイトから判定する。
+        """
+        content_type = sniff_image_mime(image_bytes)
+        extension = _IMAGE_EXTENSIONS.get(content_type, "bin")
+        temp_id = image_digest.hex() if image_digest else str(uuid.uuid4())
+        return f"temp/serpapi/{temp_id}.{extension}"
+
+    async def sign_serpapi_temp_path(self, temp_path: str) -> str:
+        """
+        SerpApi用一時画像の署名付きURLを生成する
+
+        署名はオブジェクトの有無に依存せず、画像も外部に送らないため、
+        アップロード前（ガードレール判定中など）に生成しておける。
+        """
+        # 短い有効期限の署名付きURL生成（署名用のトークン更新で通信が発生する）
+        return await asyncio.to_thread(
+            self._sign_blob,
+            self.bucket.blob(temp_path),
+            timedelta(minutes=settings.SERPAPI_IMAGE_EXPIRATION_MINUTES),
+        )
+
+    async def upload_temp_bytes_for_serpapi(
         self,
-        image_base64: str,
+        image_bytes: bytes,
+        image_digest: Optional[bytes] = None,
+        signed_url: Optional[str] = None,
     ) -> str:
         """
-        SerpApi用に一時画像をアップロードし、署名付きURLを返す
+        SerpApi用に一時画像（デコード済みバイナリ）をアップロードし、署名付きURLを返す
+
+        Content-Typeと拡張子は画像の先頭バイトから判定する（PNG/WebPをJPEGとして送らない）。
+        画像のハッシュが渡された場合はハッシュをオブジェクト名にし、同じ画像が
+        アップロード済みならアップロードを省略する（他インスタンスでの再査定も含む）。
+        署名付きURLが渡されなかった場合は、アップロードと並行して生成する。
 
         Args:
-            image_base64: Base64エンコードされた画像
+            image_bytes: 画像のバイナリ（WebP変換はしない - SerpApiへそのまま送信）
+            image_digest: 画像のSHA-256（省略時はランダムなオブジェクト名）
+            signed_url: sign_serpapi_temp_path で事前に生成した署名付きURL
+                （serpapi_temp_path(image_bytes, image_digest) のパスに対するもの）
 
         Returns:
             署名付きURL（短い有効期限）
         """
-        import uuid
-
         try:
-            # Base64デコード（WebP変換はしない - SerpApiへそのまま送信）
-            image_bytes = self._decode_base64_image(image_base64)
-
             # 一時パス
-            temp_id = str(uuid.uuid4())
-            temp_path = f"temp/serpapi/{temp_id}.jpg"
-
-            # アップロード
-            blob = self.bucket.blob(temp_path)
-            blob.upload_from_string(image_bytes, content_type="image/jpeg")
-
-            # 短い有効期限の署名付きURL生成
-            url = blob.generate_signed_url(
-                expiration=timedelta(minutes=settings.SERPAPI_IMAGE_EXPIRATION_MINUTES),
-                method="GET",
-                **self._get_signing_kwargs(),
+            content_type = sniff_image_mime(image_bytes)
+            temp_path = self.serpapi_temp_path(image_bytes, image_digest)
+
+            async def ensure_uploaded() -> None:
+                if image_digest and await self._object_exists(temp_path):
+                    logger.info(f"Reusing temp image for SerpApi: {temp_path}")
+                    return
+                await self._upload_bytes(
+                    temp_path,
+                    image_bytes,
+                    content_type,
+                    cache_control=SERPAPI_TEMP_CACHE_CONTROL,
+                )
+                logger.info(f"Uploaded temp image for SerpApi: {temp_path}")
+
+            if signed_url is not None:
+                await ensure_uploaded()
+                return signed_url
+
+            _, url = await asyncio.gather(
+                ensure_uploaded(),
+                self.sign_serpapi_temp_path(temp_path),
             )
-
-            logger.info(f"Uploaded temp image for SerpApi: {temp_path}")
             return url
 
         except Exception as e:
@@ -0,0 +1,104 @@
+"""
+Vertex AI (Gemini) クライアントモジュール
+
+各ノード（vision / search / price）で同じモデルのクライアントを共有し、
+Vertex AI への接続を使い回す。
+"""
+
+from typing import Optional
+
+import httpx
+from google import genai
+from google.genai import types
+from langchain_google_genai import ChatGoogleGenerativeAI
+
+from core.config import settings
+from core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# アイドル接続を維持する時間（秒）
+# 査定と査定の間も接続を残し、TLSハンドシェイクをやり直さないようにする
+HTTP_KEEPALIVE_EXPIRY_SECONDS = 300.0
+
+# (モデル名, リトライ回数) -> クライアント
+_chat_models: dict[tuple[str, int], ChatGoogleGenerativeAI] = {}
+
+# google-genai を直接使う呼び出し用のクライアント
+_genai_client: Optional[genai.Client] = None
+
+
+def _client_args() -> dict:
+    """HTTPクライアントの設定（HTTP/2 + 長めのkeep-alive）"""
+    return {
+        "http2": True,
+        "limits": httpx.Limits(keepalive_expiry=HTTP_KEEPALIVE_EXPIRY_SECONDS),
+    }
+
+
+def get_chat_model(model: str, max_retries: int = 2) -> ChatGoogleGenerativeAI:
+    """
+    共有のチャットモデルを取得
+
+    HTTP/2 を有効にして、ノード間で連続する呼び出しや並行リクエストを
+    1本の接続に多重化する。クライアントはリクエスト固有の状態を持たないため、
+    Callbackや構造化出力は呼び出し側で
+    with_config / with_structured_output により付与する。
+
+    Args:
+        model: モデル名
+        max_retries: APIエラー時のリトライ回数
+
+    Returns:
+        ChatGoogleGenerativeAI（temperature=0）
+    """
+    key = (model, max_retries)
+    llm = _chat_models.get(key)
+    if llm is None:
+        llm = ChatGoogleGenerativeAI(
+            model=model,
+            project=settings.GCP_PROJECT_ID,
+            location=settings.GCP_LOCATION,
+            temperature=0,
+            max_retries=max_retries,
+            vertexai=True,
+            client_args=_client_args(),
+        )
+        _chat_models[key] = llm
+        logger.info("Vertex AI chat model initialized: %s", model)
+    return llm
+
+
+def get_genai_client() -> genai.Client:
+    """
+    共有の google-genai クライアントを取得
+
+    LangChainのメッセージ変換を通さず、画像バイナリをそのままリクエストに載せる
+    呼び出し（vision_node）で使う。モデル・生成設定は呼び出しごとに指定する。
+    """
+    global _genai_client
+    if _genai_client is None:
+        client_args = _client_args()
+        _genai_client = genai.Client(
+            vertexai=True,
+            project=settings.GCP_PROJECT_ID,
+            location=settings.GCP_LOCATION,
+            http_options=types.HttpOptions(
+                client_args=client_args,
+                async_client_args=client_args,
+            ),
+        )
+        logger.info("Vertex AI genai client initialized")
+    return _genai_client
+
+
+async def aclose() -> None:
+    """共有クライアントの接続を閉じる（アプリ終了時に呼び出す）"""
+    global _genai_client
+    for llm in _chat_models.values():
+        await llm.aclose()
+    _chat_models.clear()
+    if _genai_client is not None:
+        await _genai_client.aio.aclose()
+        _genai_client.close()
+        _genai_client = None
@@ -1,13 +1,21 @@
 import asyncio
+from dataclasses import replace
+from typing import Callable, Optional
 
 from langchain_core.messages import HumanMessage
 from langgraph.graph import StateGraph, START, END
 
+from core.config import settings
+from core.logging import get_logger
+from core.sse import format_sse
 from features.agent.state import AgentState
 from features.agent.vision.node import vision_node
+from features.agent.vision.schema import InitialAnalysis
 from features.agent.search.node import search_node
 from features.agent.price.node import price_node
 
+logger = get_logger(__name__)
+
 
 # ---------------------------------------------------------
 # 条件分岐関数
@@ -17,7 +25,7 @@ def should_search(state: AgentState) -> str:
     vision_nodeの結果に基づいて検索を行うかどうかを判定する。
     processableの場合のみ検索を実行する。
     """
-    analysis = state.get("analysis_result")
+    analysis = state.analysis_result
     if analysis and analysis.category_type == "processable":
         return "search"
     return "end"
@@ -28,7 +36,7 @@ def should_price(state: AgentState) -> str:
     search_nodeの結果に基づいて価格検索を行うかどうかを判定する。
     mass_productの場合のみ価格検索を実行する。
     """
-    search_output = state.get("search_output")
+    search_output = state.search_output
     if search_output and search_output.analysis.classification == "mass_product":
         return "price"
     return "end"
@@ -75,10 +83,71 @@ app = workflow.compile()
 # API呼び出し用関数
 # =============================================
 
+# thinkingイベントを破棄した回数（低速クライアント検知用）
+slow_client_count = 0
+
+
+async def _emit(thinking_queue: asyncio.Queue, event: dict) -> None:
+    """
+    イベントをSSE形式に変換してキューに送信
+
+    キューの要素は (イベント種別, SSEのdata行バイト列) のタプル。
+    変換をここで一度だけ行うことで、キューに辞書を保持せずに済む。
+    クライアントに送信しない node_complete はキューに入れない。
+
+    キューが満杯のままタイムアウトした場合、thinkingイベントは破棄する（欠落可）。
+    node_start / error は欠落させずに空きを待つ。
+    """
+    global slow_client_count
+
+    chunk = format_sse(event)
+    if chunk is None:
+        return
+
+    item = (event["type"], chunk)
+    if event["type"] != "thinking":
+        await thinking_queue.put(item)
+        return
+
+    try:
+        await asyncio.wait_for(
+            thinking_queue.put(item), timeout=settings.SSE_QUEUE_TIMEOUT
+        )
+    except asyncio.TimeoutError:
+        slow_client_count += 1
+        logger.warning(
+            f"Slow client: dropped thinking event (node={event.get('node')}, "
+            f"total_dropped={slow_client_count})"
+        )
+
+
+def _apply_update(state: AgentState, update: dict) -> None:
+    """ノードの戻り値（更新するフィールドのみの辞書）を状態に反映"""
+    for key, value in update.items():
+        setattr(state, key, value)
+
+
+def _outputs(state: AgentState) -> dict:
+    """
+    stream_with_milestones の戻り値を構築
+
+    画像（Base64文字列）を含む messages は返さず、エージェント完了後に
+    画像データが呼び出し側で保持され続けないようにする。
+    """
+    return {
+        "analysis_result": state.analysis_result,
+        "search_output": state.search_output,
+        "price_output": state.price_output,
+    }
+
 
 async def stream_with_milestones(
     image_data: str,
     thinking_queue: asyncio.Queue,
+    image_bytes: Optional[bytes] = None,
+    on_vision_complete: Optional[
+        Callable[[Optional[InitialAnalysis], Optional[bytes]], None]
+    ] = None,
 ) -> dict:
     """
     画像データを受け取って実際のノード関数を実行し、
@@ -90,14 +159,16 @@ async def stream_with_milestones(
     Args:
         image_data: Base64エンコードされた画像文字列
         thinking_queue: マイルストーンメッセージを送信するキュー
+            （要素は (イベント種別, SSEのdata行バイト列) のタプル）
+        image_bytes: 呼び出し側でデコード済みの画像バイナリ
+            （あればノードで再デコードしない）
+        on_vision_complete: vision_node 完了時に (解析結果, 画像バイナリ) で
+            呼ぶコールバック（ガードレール判定後に始める画像保存など。
+            画像の参照を手放す前に呼ぶ）
 
     Returns:
         analysis_result, search_output, price_output を含む辞書
     """
-    from core.logging import get_logger
-
-    logger = get_logger(__name__)
-
     message = HumanMessage(
         content=[
             {
@@ -107,18 +178,13 @@ async def stream_with_milestones(
         ]
     )
 
-    state = {
-        "messages": [message],
-        "retry_count": 0,
-        "analysis_result": None,
-        "search_output": None,
-        "price_output": None,
-    }
+    state = AgentState(messages=[message], image_bytes=image_bytes)
 
     # ========================================
     # Vision Node
     # ========================================
-    await thinking_queue.put(
+    await _emit(
+        thinking_queue,
         {
             "type": "node_start",
             "node": "vision",
@@ -126,24 +192,37 @@ async def stream_with_milestones(
         }
     )
 
+    # 画像の参照は state（messages / image_bytes）だけに持たせる
+    del image_data, message, image_bytes
+
     try:
         vision_result = await vision_node(state)
-        state.update(vision_result)
+        _apply_update(state, vision_result)
     except Exception as e:
         logger.error(f"Vision Node Error: {e}", exc_info=True)
-        await thinking_queue.put(
+        await _emit(
+            thinking_queue,
             {
                 "type": "error",
                 "node": "vision",
                 "message": str(e),
             }
         )
-        return state
+        return _outputs(state)
 
-    analysis = state.get("analysis_result")
+    if on_vision_complete is not None:
+        on_vision_complete(state.analysis_result, state.image_bytes)
+
+    # 画像を使うのは vision_node のみのため、後続ノードの実行中は保持しない
+    # （数MBのBase64文字列とバイナリを search / price の数秒間に渡って持ち続けない）
+    state.messages = []
+    state.image_bytes = None
+
+    analysis = state.analysis_result
 
     if analysis and analysis.category_type == "processable":
-        await thinking_queue.put(
+        await _emit(
+            thinking_queue,
             {
                 "type": "thinking",
                 "node": "vision",
@@ -151,7 +230,8 @@ async def stream_with_milestones(
             }
         )
     elif analysis and analysis.category_type == "prohibited":
-        await thinking_queue.put(
+        await _emit(
+            thinking_queue,
             {
                 "type": "thinking",
                 "node": "vision",
@@ -159,7 +239,8 @@ async def stream_with_milestones(
             }
         )
     else:
-        await thinking_queue.put(
+        await _emit(
+            thinking_queue,
             {
                 "type": "thinking",
                 "node": "vision",
@@ -167,7 +248,8 @@ async def stream_with_milestones(
             }
         )
 
-    await thinking_queue.put(
+    await _emit(
+        thinking_queue,
         {
             "type": "node_complete",
             "node": "vision",
@@ -180,12 +262,58 @@ async def stream_with_milestones(
 
     # processable でなければ終了
     if not analysis or analysis.category_type != "processable":
-        return state
+        return _outputs(state)
+
+    # price_node の検索は商品名さえあれば始められるため、search_node と並行して
+    # 先行実行しておく（分類結果が mass_product でなければキャンセル）
+    price_task = None
+    if settings.PRICE_SPECULATIVE_PREFETCH:
+        price_task = asyncio.create_task(price_node(replace(state)))
+
+    try:
+        return await _search_and_price(state, thinking_queue, price_task)
+    finally:
+        if price_task is not None and not price_task.done():
+            price_task.cancel()
+
+
+def _is_same_product(
+    item_name: Optional[str], identified_product: Optional[str]
+) -> bool:
+    """
+    先行実行した価格検索（vision_nodeの商品名で検索）を流用できるか判定する
+
+    search_node が商品名を特定しなかった場合、または特定した商品名の先頭
+    （カンマ以前の本体部分）が vision_node の商品名と一致する場合に流用する。
+    """
+    if not identified_product:
+        return True
+    if not item_name:
+        return False
+    base_name = identified_product.split(",", 1)[0]
+    return base_name.split() == item_name.replace(",", " ").split()
+
+
+async def _search_and_price(
+    state: AgentState,
+    thinking_queue: asyncio.Queue,
+    price_task: Optional[asyncio.Task],
+) -> dict:
+    """
+    search_node と price_node を実行する（stream_with_milestones の後半）
+
+    Args:
+        state: vision_node 実行後の状態
+        thinking_queue: マイルストーンメッセージを送信するキュー
+        price_task: 先行実行中の price_node タスク（無効時はNone）
+    """
+    analysis = state.analysis_result
 
     # ========================================
     # Search Node
     # ========================================
-    await thinking_queue.put(
+    await _emit(
+        thinking_queue,
         {
             "type": "node_start",
             "node": "search",
@@ -195,23 +323,25 @@ async def stream_with_milestones(
 
     try:
         search_result = await search_node(state)
-        state.update(search_result)
+        _apply_update(state, search_result)
     except Exception as e:
         logger.error(f"Search Node Error: {e}", exc_info=True)
-        await thinking_queue.put(
+        await _emit(
+            thinking_queue,
             {
                 "type": "error",
                 "node": "search",
                 "message": str(e),
             }
         )
-        return state
+        return _outputs(state)
 
-    search_output = state.get("search_output")
+    search_output = state.search_output
 
     if search_output and search_output.analysis.classification == "mass_product":
         product = search_output.analysis.identified_product or analysis.item_name
-        await thinking_queue.put(
+        await _emit(
+            thinking_queue,
             {
                 "type": "thinking",
                 "node": "search",
@@ -219,7 +349,8 @@ async def stream_with_milestones(
             }
         )
     else:
-        await thinking_queue.put(
+        await _emit(
+            thinking_queue,
             {
                 "type": "thinking",
                 "node": "search",
@@ -227,7 +358,8 @@ async def stream_with_milestones(
             }
         )
 
-    await thinking_queue.put(
+    await _emit(
+        thinking_queue,
         {
             "type": "node_complete",
             "node": "search",
@@ -244,12 +376,13 @@ async def stream_with_milestones(
 
     # mass_product でなければ終了
     if not search_output or search_output.analysis.classification != "mass_product":
-        return state
+        return _outputs(state)
 
     # ========================================
     # Price Node
     # ========================================
-    await thinking_queue.put(
+    await _emit(
+        thinking_queue,
         {
             "type": "node_start",
             "node": "price",
@@ -258,23 +391,30 @@ async def stream_with_milestones(
     )
 
     try:
-        price_result = await price_node(state)
-        state.update(price_result)
+        if price_task is not None and _is_same_product(
+            analysis.item_name, search_output.analysis.identified_product
+        ):
+            price_result = await price_task
+        else:
+            price_result = await price_node(state)
+        _apply_update(state, price_result)
     except Exception as e:
         logger.error(f"Price Node Error: {e}", exc_info=True)
-        await thinking_queue.put(
+        await _emit(
+            thinking_queue,
             {
                 "type": "error",
                 "node": "price",
                 "message": str(e),
             }
         )
-        return state
+        return _outputs(state)
 
-    price_output = state.get("price_output")
+    price_output = state.price_output
 
     if price_output and price_output.valuation.min_price > 0:
-        await thinking_queue.put(
+        await _emit(
+            thinking_queue,
             {
                 "type": "thinking",
                 "node": "price",
@@ -282,7 +422,8 @@ async def stream_with_milestones(
             }
         )
     else:
-        await thinking_queue.put(
+        await _emit(
+            thinking_queue,
             {
                 "type": "thinking",
                 "node": "price",
@@ -290,7 +431,8 @@ async def stream_with_milestones(
             }
         )
 
-    await thinking_queue.put(
+    await _emit(
+        thinking_queue,
         {
             "type": "node_complete",
             "node": "price",
@@ -301,4 +443,4 @@ async def stream_with_milestones(
         }
     )
 
-    return state
+    return _outputs(state)
@@ -0,0 +1,78 @@
+import re
+from typing import Optional, TypeVar
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables import Runnable, RunnableLambda
+from pydantic import BaseModel, ValidationError
+
+from core.logging import get_logger
+
+logger = get_logger(__name__)
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+# Grounded 呼び出しの応答に埋め込まれた <json>...</json> ブロック
+_JSON_BLOCK_RE = re.compile(r"<json>\s*(.*?)\s*</json>", re.DOTALL)
+# モデルがブロック内をコードフェンスで囲んだ場合に除去する
+_CODE_FENCE_RE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+
+def response_text(content) -> str:
+    """
+    LLM応答の content を文字列に正規化する。
+
+    Gemini はパート配列（dict のリスト）で返すことがあるため、text パートを連結する。
+    """
+    if isinstance(content, str):
+        return content
+    parts = []
+    for part in content or []:
+        if isinstance(part, str):
+            parts.append(part)
+        elif isinstance(part, dict) and part.get("type") == "text":
+            parts.append(part.get("text", ""))
+    return "".join(parts)
+
+
+def parse_tagged_json(text: str, model: type[ModelT]) -> Optional[ModelT]:
+    """
+    応答テキスト末尾の <json>...</json> ブロックを Pydantic モデルとして検証する。
+
+    Gemini は controlled generation と Google Search tool を同時に使えないため、
+    Grounded 呼び出しに JSON をインラインで出力させ、1回の呼び出しで構造化結果を得る。
+    ブロックが無い・検証に失敗した場合は None を返し、
+    呼び出し側で抽出ステップにフォールバックする。
+    """
+    matches = _JSON_BLOCK_RE.findall(text)
+    if not matches:
+        return None
+    payload = _CODE_FENCE_RE.sub("", matches[-1])
+    try:
+        return model.model_validate_json(payload)
+    except ValidationError as e:
+        logger.warning("Tagged JSON validation failed for %s: %s", model.__name__, e)
+        return None
+
+
+def json_schema_output(llm: BaseChatModel, model: type[ModelT]) -> Runnable:
+    """
+    構造化出力（controlled generation）用のRunnableを構築する
+
+    with_structured_output と同じくJSONスキーマで出力を制約するが、スキーマは
+    ここで一度だけ生成し、応答は PydanticOutputParser（JSON文字列の部分パース +
+    dict経由の検証）を通さず model_validate_json で直接検証する。
+    モジュール読み込み時に1回だけ呼び出すこと。
+    """
+    schema = model.model_json_schema()
+
+    def _parse(message: BaseMessage) -> ModelT:
+        return model.model_validate_json(response_text(message.content))
+
+    bound = llm.bind(response_mime_type="application/json", response_json_schema=schema)
+    return bound | RunnableLambda(_parse)
+
+
+def strip_tagged_json(text: str) -> str:
+    """<json>...</json> ブロックを除いたレポート本文を返す"""
+    return _JSON_BLOCK_RE.sub("", text).strip()
@@ -1,9 +1,16 @@
 from langchain_core.messages import HumanMessage, SystemMessage
-from langchain_google_genai import ChatGoogleGenerativeAI
 
 from core.config import settings
 from core.llm_callbacks import get_llm_callbacks
 from core.logging import get_logger
+from core.rate_limit import gemini_limiter
+from core.vertex_client import get_chat_model
+from features.agent.grounded_json import (
+    json_schema_output,
+    parse_tagged_json,
+    response_text,
+    strip_tagged_json,
+)
 from features.agent.price.schema import (
     PriceAnalysis,
     PriceNodeOutput,
@@ -13,56 +20,60 @@ from features.agent.state import AgentState
 
 logger = get_logger(__name__)
 
+# 商品名のカンマ区切りの属性を検索クエリ用に空白区切りへ変換する変換表
+_COMMA_TO_SPACE = str.maketrans({",": " "})
+
+# LLMクライアントはリクエストごとに生成せず、search_nodeと共有する
+# （認証情報の解決や接続確立を毎回行わず、接続を再利用するため）。
+# リクエスト固有の状態は持たないため、asyncioで並行に呼び出しても安全
+_llm = get_chat_model(settings.MODEL_SEARCH_NODE)
+
+# Step 1: Google Search Grounding（テキスト + <json> 出力）
+_LLM_SEARCH = _llm.with_config({"callbacks": get_llm_callbacks("price.search")})
+
+# Step 2（フォールバック）: 構造化出力。スキーマ変換もここで一度だけ行う
+_LLM_EXTRACT = json_schema_output(_llm, PriceAnalysis).with_config(
+    {"callbacks": get_llm_callbacks("price.extract")}
+)
+
 
 async def price_node(state: AgentState) -> dict:
     """
-    Node Price: 価格検索ノード（2段階処理版）
+    Node Price: 価格検索ノード（Grounded JSON版）
 
     責務:
     1. search_nodeから受け取った商品情報で中古市場相場を検索
     2. 価格レンジ（最安〜最高）を算出
 
     処理フロー:
-    - Step 1: Google Search Grounding でレポート作成（テキスト出力）
-    - Step 2: レポートから価格情報を抽出（構造化出力）
+    - Step 1: Google Search Grounding でレポート作成し、末尾に <json> で価格情報を出力
+    - Step 2: <json> が無い・不正な場合のみ、レポートから価格情報を抽出（構造化出力）
 
     注意: このノードはgraph.pyの条件分岐でmass_productの場合のみ呼ばれる
     """
 
     # search_nodeの結果から商品情報を取得
-    search_output = state.get("search_output")
-    analysis_result = state.get("analysis_result")
+    search_output = state.search_output
+    analysis_result = state.analysis_result
 
+    # search_output がない場合（先行実行時）はvision_nodeの商品名で検索する
     identified_product = (
         search_output.analysis.identified_product if search_output else None
-    )
+    ) or (analysis_result.item_name if analysis_result else None)
     visual_features = (
         analysis_result.visual_features if analysis_result else []
     )
 
     # 検索クエリを構築（シンプルに）
-    search_query_parts = []
-    if identified_product:
-        # カンマを空白に変換（例: "NIKE Free RN Flyknit, 赤" → "NIKE Free RN Flyknit 赤"）
-        product_name = identified_product.replace(",", " ")
-        search_query_parts.append(product_name)
-    search_query_parts.extend(["メルカリ", "価格"])
-
-    search_query = " ".join(search_query_parts)
+    # カンマを空白に変換（例: "NIKE Free RN Flyknit, 赤" → "NIKE Free RN Flyknit 赤"）
+    product_name = (
+        identified_product.translate(_COMMA_TO_SPACE) if identified_product else ""
+    )
+    search_query = " ".join(filter(None, (product_name, "メルカリ", "価格")))
 
     # ========================================
     # Step 1: Google Search で相場レポートを作成
     # ========================================
-    llm_search = ChatGoogleGenerativeAI(
-        model=settings.MODEL_SEARCH_NODE,
-        project=settings.GCP_PROJECT_ID,
-        location=settings.GCP_LOCATION,
-        temperature=0,
-        max_retries=2,
-        vertexai=True,
-        callbacks=get_llm_callbacks("price.search"),
-    )
-
     search_prompt = f"""
 あなたは熟練の鑑定士AIエージェント『Ojoya』です。
 以下の商品について、中古市場での相場価格を調査してください。
@@ -97,6 +108,16 @@ Google検索で中古市場の相場を調査し、以下の内容を含むレ
 - 同じ商品の完全一致データがなくても、同シリーズ・同モデルの相場から推定してOK
 - 色やサイズ違いでも、同じ商品ラインの相場は参考にできる
 - 類似商品すら見つからない場合は、その旨を明記すること
+
+【出力形式】
+レポートの最後に、以下のキーを持つJSONを <json> と </json> で囲んで出力してください:
+{{"min_price": 最低価格（円、情報がない場合は0）, \
+"max_price": 最高価格（円、情報がない場合は0）,
+ "confidence": "high" | "medium" | "low", "reasoning": 価格算出の根拠,
+ "display_message": ユーザーに表示する日本語メッセージ,
+ "price_factors": ["要因: 価格への影響", ...] または null}}
+- 情報が不十分な場合は confidence: "low"
+- 価格情報が全く見つからない場合のみ min_price=0, max_price=0 とする
 """
 
     search_messages = [
@@ -106,60 +127,16 @@ Google検索で中古市場の相場を調査し、以下の内容を含むレ
 
     try:
         # Step 1: 検索してレポート作成（Grounding + テキスト出力）
-        search_response = await llm_search.ainvoke(search_messages, tools=[{"google_search": {}}])
-        search_report = search_response.content
-        logger.debug(f"Search Report: {search_report}")
-
-        # ========================================
-        # Step 2: レポートから価格情報を抽出
-        # ========================================
-        llm_extract = ChatGoogleGenerativeAI(
-            model=settings.MODEL_SEARCH_NODE,
-            project=settings.GCP_PROJECT_ID,
-            location=settings.GCP_LOCATION,
-            temperature=0,
-            max_retries=2,
-            vertexai=True,
-            callbacks=get_llm_callbacks("price.extract"),
-        )
-
-        structured_llm = llm_extract.with_structured_output(PriceAnalysis)
-
-        extract_prompt = f"""
-以下の相場調査レポートから、価格情報を抽出してください。
-
-【レポート】
-{search_report}
-
-【抽出項目】
-1. min_price: 最低価格（円）※情報がない場合は 0
-2. max_price: 最高価格（円）※情報がない場合は 0
-3. confidence: "high", "medium", "low" のいずれか
-4. reasoning: 価格算出の根拠
-5. display_message: ユーザーに表示する日本語メッセージ（例: "メルカリでの一般的な中古相場です"）
-6. price_factors: 価格に影響を与える要因のリスト（配列形式）
-
-【price_factors の出力形式】
-ユーザーがフリマ出品や買取査定の価格設定に活用できるよう、具体的な情報を出力してください:
-- 各要因は「要因: 価格への影響」の形式で記載
-- 例: ["2020年以降のモデルは8000-12000円、それ以前は5000-8000円", "箱・付属品ありで+1000-2000円", "限定カラーは通常より20%高め"]
-- 価格変動要因が見つからない場合は null
-
-【注意】
-- レポート内に価格情報がある場合は、それを min_price, max_price として抽出
-- 情報が不十分な場合は confidence: "low"
-- 類似商品の相場から推定した場合も有効な価格として扱う
-- 価格情報が全く見つからない場合のみ min_price=0, max_price=0 とする
-"""
-
-        extract_messages = [
-            SystemMessage(content=extract_prompt),
-            HumanMessage(content="レポートから価格情報を抽出してください。"),
-        ]
-
-        # Step 2: レポートから抽出（構造化出力のみ、Grounding なし）
-        analysis = await structured_llm.ainvoke(extract_messages)
-        logger.debug(f"Price Analysis: {analysis}")
+        async with gemini_limiter:
+            search_response = await _LLM_SEARCH.ainvoke(
+                search_messages, tools=[{"google_search": {}}]
+            )
+        search_text = response_text(search_response.content)
+        analysis = parse_tagged_json(search_text, PriceAnalysis)
+        if analysis is None:
+            logger.info("Grounded JSON unavailable, falling back to extraction step")
+            analysis = await _extract_price_analysis(strip_tagged_json(search_text))
+        logger.debug("Price Analysis: %s", analysis)
 
         # PriceAnalysis を PriceNodeOutput に変換
         valuation = Valuation(
@@ -198,3 +175,45 @@ Google検索で中古市場の相場を調査し、以下の内容を含むレ
                 display_message=f"価格検索中にエラーが発生しました: {str(e)}",
             )
         }
+
+
+async def _extract_price_analysis(search_report: str) -> PriceAnalysis:
+    """
+    Grounded 呼び出しが <json> を返さなかった場合のフォールバック。
+    相場レポートから価格情報を構造化出力で抽出する。
+    """
+    extract_prompt = f"""
+以下の相場調査レポートから、価格情報を抽出してください。
+
+【レポート】
+{search_report}
+
+【抽出項目】
+1. min_price: 最低価格（円）※情報がない場合は 0
+2. max_price: 最高価格（円）※情報がない場合は 0
+3. confidence: "high", "medium", "low" のいずれか
+4. reasoning: 価格算出の根拠
+5. display_message: ユーザーに表示する日本語メッセージ（例: "メルカリでの一般的な中古相場です"）
+6. price_factors: 価格に影響を与える要因のリスト（配列形式）
+
+【price_factors の出力形式】
+ユーザーがフリマ出品や買取査定の価格設定に活用できるよう、具体的な情報を出力してください:
+- 各要因は「要因: 価格への影響」の形式で記載
+- 例: ["2020年以降のモデルは8000-12000円、それ以前は5000-8000円", "箱・付属品ありで+1000-2000円", "限定カラーは通常より20%高め"]
+- 価格変動要因が見つからない場合は null
+
+【注意】
+- レポート内に価格情報がある場合は、それを min_price, max_price として抽出
+- 情報が不十分な場合は confidence: "low"
+- 類似商品の相場から推定した場合も有効な価格として扱う
+- 価格情報が全く見つからない場合のみ min_price=0, max_price=0 とする
+"""
+
+    extract_messages = [
+        SystemMessage(content=extract_prompt),
+        HumanMessage(content="レポートから価格情報を抽出してください。"),
+    ]
+
+    # 構造化出力のみ、Grounding なし
+    async with gemini_limiter:
+        return await _LLM_EXTRACT.ainvoke(extract_messages)
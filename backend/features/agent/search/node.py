@@ -1,9 +1,17 @@
+import re
+
 from langchain_core.messages import HumanMessage, SystemMessage
-from langchain_google_genai import ChatGoogleGenerativeAI
 
 from core.config import settings
 from core.llm_callbacks import get_llm_callbacks
 from core.logging import get_logger
+from core.rate_limit import gemini_limiter
+from core.vertex_client import get_chat_model
+from features.agent.grounded_json import (
+    json_schema_output,
+    parse_tagged_json,
+    response_text,
+)
 from features.agent.search.schema import (
     SearchAnalysis,
     SearchNodeOutput,
@@ -12,6 +20,28 @@ from features.agent.state import AgentState
 
 logger = get_logger(__name__)
 
+# LLMクライアントはリクエストごとに生成せず、price_nodeと共有する
+_llm = get_chat_model(settings.MODEL_SEARCH_NODE)
+
+# Google Search Grounding付き（構造化出力なし）
+# ※ Gemini APIはcontrolled generation + Search toolの同時使用を非サポートのため、
+#    JSONは応答内の <json> ブロックとして出力させる
+_LLM_SEARCH = _llm.with_config({"callbacks": get_llm_callbacks("search")})
+
+# フォールバック用: 構造化出力（Google Searchなし）
+_LLM_EXTRACT = json_schema_output(_llm, SearchAnalysis).with_config(
+    {"callbacks": get_llm_callbacks("search.extract")}
+)
+
+# ブランド名・型番を含む商品名
+# （英大文字2文字以上の後に数字を含む。例: "NIKE Air Max 90"）
+_SKU_LIKE_RE = re.compile(r"[A-Z]{2,}.*[0-9]")
+
+
+def _looks_like_sku(item_name: str) -> bool:
+    """商品名がブランド名・型番で特定済みに見えるか判定"""
+    return _SKU_LIKE_RE.search(item_name) is not None
+
 
 async def search_node(state: AgentState) -> dict:
     """
@@ -26,40 +56,36 @@ async def search_node(state: AgentState) -> dict:
     """
 
     # vision_nodeの結果から商品情報を取得
-    analysis_result = state.get("analysis_result")
+    analysis_result = state.analysis_result
     item_name = analysis_result.item_name if analysis_result else None
     visual_features = analysis_result.visual_features if analysis_result else []
 
-    # 検索クエリを構築
-    search_query_parts = []
-    if item_name:
-        search_query_parts.append(item_name)
-    if visual_features:
-        search_query_parts.extend(visual_features[:3])  # 最初の3つの特徴を使用
-
-    search_query = " ".join(search_query_parts) if search_query_parts else "商品"
-
-    # Step 1用: Google Search Grounding付きLLM（構造化出力なし）
-    # ※ Gemini APIはcontrolled generation + Search toolの同時使用を非サポート
-    search_llm = ChatGoogleGenerativeAI(
-        model=settings.MODEL_SEARCH_NODE,
-        project=settings.GCP_PROJECT_ID,
-        location=settings.GCP_LOCATION,
-        temperature=0,
-        max_retries=2,
-        vertexai=True,
-        callbacks=get_llm_callbacks("search"),
-    )
+    # vision_nodeが高い確信度でブランド名・型番まで特定済みなら、型番商品は
+    # 市場流通品のため検索せずに既製品と判定する（LLM呼び出し1回分を省略）
+    if (
+        settings.SEARCH_SKU_SHORT_CIRCUIT
+        and item_name
+        and analysis_result.confidence == "high"
+        and _looks_like_sku(item_name)
+    ):
+        logger.info("Skipping grounded search for SKU-like item: %s", item_name)
+        return {
+            "search_output": SearchNodeOutput(
+                search_results=[],
+                analysis=SearchAnalysis(
+                    classification="mass_product",
+                    confidence="high",
+                    reasoning=f"画像解析でブランド名・型番が特定できたため既製品と判定しました（{item_name}）",
+                    identified_product=item_name,
+                ),
+                search_performed=False,
+            )
+        }
 
-    # Step 2用: 構造化出力LLM（Google Searchなし）
-    structured_llm = ChatGoogleGenerativeAI(
-        model=settings.MODEL_SEARCH_NODE,
-        project=settings.GCP_PROJECT_ID,
-        location=settings.GCP_LOCATION,
-        temperature=0,
-        max_retries=2,
-        vertexai=True,
-    ).with_structured_output(SearchAnalysis)
+    # 検索クエリを構築（特徴は最初の3つを使用）
+    search_query = (
+        " ".join(filter(None, (item_name, *visual_features[:3]))) or "商品"
+    )
 
     system_prompt = f"""
 あなたは熟練の鑑定士AIエージェント『Ojoya』です。
@@ -112,6 +138,12 @@ async def search_node(state: AgentState) -> dict:
 【注意事項】
 - 迷った場合は mass_product 寄りで判断してください（価格検索で相場が見つからなければユーザーに伝えられるため）
 - Google検索で見つかった具体的な情報（サイト名、価格帯など）を reasoning に含めてください
+
+【出力形式】
+調査結果の最後に、出力項目をキーとするJSONを <json> と </json> で囲んで出力してください:
+{{"classification": "mass_product" | "unique_item", \
+"confidence": "high" | "medium" | "low",
+ "reasoning": 判定理由, "identified_product": 商品名 または null}}
 """
 
     # テキストベースで検索を実行（画像なし）
@@ -123,19 +155,18 @@ async def search_node(state: AgentState) -> dict:
     ]
 
     try:
-        # Step 1: Google Search Groundingで市場情報を収集
-        search_response = await search_llm.ainvoke(
-            messages, tools=[{"google_search": {}}]
-        )
-
-        # Step 2: 収集した情報を構造化出力で分類
-        extract_messages = [
-            SystemMessage(
-                content="以下の調査結果を基に、商品の分類を行ってください。出力項目: classification, confidence, reasoning, identified_product"
-            ),
-            HumanMessage(content=search_response.content),
-        ]
-        analysis = await structured_llm.ainvoke(extract_messages)
+        # Google Search Groundingで市場情報を収集
+        async with gemini_limiter:
+            search_response = await _LLM_SEARCH.ainvoke(
+                messages, tools=[{"google_search": {}}]
+            )
+
+        # Grounded 応答に埋め込まれた <json> を検証（無ければ構造化出力で分類）
+        search_text = response_text(search_response.content)
+        analysis = parse_tagged_json(search_text, SearchAnalysis)
+        if analysis is None:
+            logger.info("Grounded JSON unavailable, falling back to extraction step")
+            analysis = await _extract_search_analysis(search_text)
 
         return {
             "search_output": SearchNodeOutput(
@@ -158,3 +189,21 @@ async def search_node(state: AgentState) -> dict:
                 search_performed=False,
             )
         }
+
+
+async def _extract_search_analysis(search_report: str) -> SearchAnalysis:
+    """
+    Grounded 呼び出しが <json> を返さなかった場合のフォールバック。
+    収集した情報を構造化出力で分類する（Google Searchなし）。
+    """
+    extract_messages = [
+        SystemMessage(
+            content=(
+                "以下の調査結果を基に、商品の分類を行ってください。"
+                "出力項目: classification, confidence, reasoning, identified_product"
+            )
+        ),
+        HumanMessage(content=search_report),
+    ]
+    async with gemini_limiter:
+        return await _LLM_EXTRACT.ainvoke(extract_messages)
@@ -1,14 +1,16 @@
+from dataclasses import dataclass, field
 from typing import Optional
-from typing_extensions import TypedDict
 
 from features.agent.vision.schema import InitialAnalysis
 from features.agent.search.schema import SearchNodeOutput
 from features.agent.price.schema import PriceNodeOutput
 
 
-class AgentState(TypedDict):
-    messages: list
-    analysis_result: Optional[InitialAnalysis]  # node_visionの結果
-    search_output: Optional[SearchNodeOutput]   # node_searchの結果
-    price_output: Optional[PriceNodeOutput]     # node_priceの結果
-    retry_count: int                            # リトライ回数
\ No newline at end of file
+@dataclass(slots=True)
+class AgentState:
+    messages: list = field(default_factory=list)
+    image_bytes: Optional[bytes] = None                # デコード済みの画像バイナリ
+    analysis_result: Optional[InitialAnalysis] = None  # node_visionの結果
+    search_output: Optional[SearchNodeOutput] = None   # node_searchの結果
+    price_output: Optional[PriceNodeOutput] = None     # node_priceの結果
+    retry_count: int = 0                               # リトライ回数
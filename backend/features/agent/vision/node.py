@@ -5,65 +5,55 @@ Vision Node - SerpApi Google Lens統合
 軽量LLMによるガードレールチェックも実施。
 """
 
+import asyncio
+import binascii
+import hashlib
 import re
+import time
+from collections import OrderedDict
 from typing import Optional
 
-from langchain_core.messages import SystemMessage
-from langchain_google_genai import ChatGoogleGenerativeAI
+from google.genai import types
 
 from core.config import settings
 from core.logging import get_logger
+from core.rate_limit import gemini_limiter
 from core.serpapi import serpapi_client
 from core.storage import storage_client
+from core.vertex_client import get_genai_client
 from features.agent.state import AgentState
 from features.agent.vision.schema import GuardrailResult, InitialAnalysis
 from features.agent.vision.serpapi_schema import GoogleLensResponse
 
 logger = get_logger(__name__)
 
-
-def _parse_product_identification(text: str) -> tuple[Optional[str], list[str]]:
-    """LLM応答から商品名と特徴をパース"""
-    item_name = None
-    visual_features = []
-
-    for line in text.strip().splitlines():
-        line = line.strip()
-        if line.startswith("商品名:") or line.startswith("商品名："):
-            item_name = line.split(":", 1)[-1].split("：", 1)[-1].strip()
-        elif line.startswith("特徴:") or line.startswith("特徴："):
-            raw = line.split(":", 1)[-1].split("：", 1)[-1].strip()
-            visual_features = [f.strip() for f in raw.split(",") if f.strip()]
-
-    return item_name, visual_features
-
-
-async def _identify_product_name(
-    messages: list,
-    lens_result: GoogleLensResponse,
-) -> tuple[Optional[str], list[str]]:
-    """
-    LLMで画像+Google Lens結果から正確な商品名を特定
-
-    Returns:
-        (item_name, visual_features)
-    """
-    llm = ChatGoogleGenerativeAI(
-        model=settings.MODEL_VISION_NODE,
-        project=settings.GCP_PROJECT_ID,
-        location=settings.GCP_LOCATION,
-        temperature=0,
-        max_retries=2,
-        vertexai=True,
-    )
-
-    lens_context = lens_result.to_llm_context()
-
-    prompt = f"""あなたは商品鑑定の専門家です。
-ユーザーが撮影した商品画像と、Google Lens画像検索の結果を照合して、正確な商品名を特定してください。
-
-【Google Lens検索結果】
-{lens_context}
+# ガードレール判定のリトライ回数（ChatGoogleGenerativeAIの既定値と同じ）
+GUARDRAIL_MAX_RETRIES = 6
+# 商品特定のリトライ回数（get_chat_model の既定値と同じ）
+IDENTIFY_MAX_RETRIES = 2
+# HttpRetryOptions の attempts は初回の呼び出しを含むため、リトライ回数に1を足して渡す
+
+# data:image/...;base64, ヘッダ（本体は match.end() 以降をスライスする）
+_DATA_URL_RE = re.compile(r"data:(image/[^;]+);base64,")
+# data URLからMIMEタイプを取得できない場合の既定値
+_DEFAULT_IMAGE_MIME = "image/jpeg"
+
+# 商品特定の応答の「商品名: ...」「特徴: ...」行（全角コロンも許容）
+_IDENTIFICATION_LINE_RE = re.compile(
+    r"^[ \t]*(商品名|特徴)[ \t]*[:：][ \t]*(.+?)[ \t\r]*$", re.MULTILINE
+)
+# 改行まで出力し終えた「商品名」「特徴」行（ストリーミングの打ち切り判定用）
+_IDENTIFICATION_DONE_RE = re.compile(
+    r"^[ \t]*(商品名|特徴)[ \t]*[:：].*?\S.*\n", re.MULTILINE
+)
+# 特徴の区切り（カンマ・読点）
+_FEATURE_SEP_RE = re.compile(r"\s*[,、]\s*")
+# 商品名の単語（ナレッジグラフと類似商品のタイトル照合用）
+_TITLE_TOKEN_RE = re.compile(r"\w+")
+
+_IDENTIFY_PROMPT = """あなたは商品鑑定の専門家です。
+ユーザーが撮影した商品画像と、画像の後に添付するGoogle Lens画像検索の結果を照合して、\
+正確な商品名を特定してください。
 
 【タスク】
 1. 画像に写っている商品を確認
@@ -87,17 +77,161 @@ async def _identify_product_name(
 - 確信が持てない部分は省略してよい（不正確な情報を入れるより省略する）
 """
 
-    identify_messages = [
-        SystemMessage(content=prompt),
-    ] + messages
+_GUARDRAIL_PROMPT = """あなたは画像の安全性を判定するモデレーターです。
+画像を注意深く観察し、以下の禁止コンテンツが含まれていないか判定してください。
+
+【禁止コンテンツ一覧】
+1. 人物の顔が明確に写っている（※商品を着用しているモデル写真は除く）
+2. 個人情報（住所、電話番号、クレジットカード番号、マイナンバーカード、保険証、パスポート、免許証など）
+3. 現金・有価証券
+4. 動物・ペット・生き物（犬、猫、鳥、魚、爬虫類、昆虫など種類を問わず全ての生き物。ただし動物のぬいぐるみ・フィギュア・イラストなどの「商品」は除く）
 
-    result = await llm.ainvoke(identify_messages)
+【特に注意すべき点】
+- 画像の主要な被写体が生きている動物・ペットである場合は必ず禁止です
+- このサービスは「商品の査定」が目的です。商品ではないもの（ペット、人物など）は禁止です
+- 判断に迷う場合は禁止と判定してください"""
 
-    return _parse_product_identification(result.content)
+# Geminiの呼び出しはLangChainを通さず google-genai を直接使う。
+# 画像はデコード済みのバイナリをそのままPartにし、
+# data URLのパース・Base64の再デコードを省く。
+# 生成設定（システムプロンプト・スキーマ・リトライ）は
+# モジュール読み込み時に一度だけ構築する
+_IDENTIFY_CONFIG = types.GenerateContentConfig(
+    system_instruction=_IDENTIFY_PROMPT,
+    temperature=0,
+    http_options=types.HttpOptions(
+        retry_options=types.HttpRetryOptions(attempts=IDENTIFY_MAX_RETRIES + 1)
+    ),
+)
+
+# ガードレール判定: 構造化出力（JSONスキーマで出力を制約）
+_GUARDRAIL_CONFIG = types.GenerateContentConfig(
+    system_instruction=_GUARDRAIL_PROMPT,
+    temperature=0,
+    response_mime_type="application/json",
+    response_json_schema=GuardrailResult.model_json_schema(),
+    http_options=types.HttpOptions(
+        retry_options=types.HttpRetryOptions(attempts=GUARDRAIL_MAX_RETRIES + 1)
+    ),
+)
+
+# ガードレール判定（簡易）: 禁止なら Y、問題なければ N の1文字だけを出力させる。
+# 出力トークン数を最小にして判定を速くし、理由は禁止と判定した場合だけ上の設定で取得する
+_GUARDRAIL_VERDICT_PROHIBITED = "Y"
+_GUARDRAIL_VERDICT_PROMPT = (
+    _GUARDRAIL_PROMPT
+    + """
+
+【出力】
+禁止コンテンツが含まれている場合は Y、含まれていない場合は N の\
+1文字だけを出力してください。"""
+)
+# 禁止と判定したが理由を取得できなかった場合の理由
+_GUARDRAIL_FALLBACK_REASON = (
+    "禁止コンテンツが検出されました: 査定対象外の内容が含まれています"
+)
+_GUARDRAIL_VERDICT_CONFIG = types.GenerateContentConfig(
+    system_instruction=_GUARDRAIL_VERDICT_PROMPT,
+    temperature=0,
+    response_mime_type="text/x.enum",
+    response_schema=types.Schema(type=types.Type.STRING, enum=["Y", "N"]),
+    http_options=types.HttpOptions(
+        retry_options=types.HttpRetryOptions(attempts=GUARDRAIL_MAX_RETRIES + 1)
+    ),
+)
+
+# ガードレール判定結果のキャッシュ上限（件数）
+GUARDRAIL_CACHE_MAX_SIZE = 50_000
+
+# (画像のSHA-256, モデル名) -> 判定結果（問題なしはNone）
+_guardrail_cache: OrderedDict[tuple[bytes, str], Optional[InitialAnalysis]] = (
+    OrderedDict()
+)
+# 判定中の (画像のSHA-256, モデル名) -> LLM呼び出しタスク
+# Geminiのバッチ推論はジョブ型（結果取得まで数分以上）で
+# 査定のストリーミング応答に間に合わないため、異なる画像の判定はまとめず、
+# 同じ画像の判定だけを1回の呼び出しに集約する
+_guardrail_inflight: dict[tuple[bytes, str], asyncio.Task] = {}
+
+# Google Lens検索結果のキャッシュ設定
+LENS_CACHE_MAX_SIZE = 4096
+LENS_CACHE_TTL_SECONDS = 3600
+
+# (画像のSHA-256, 検索タイプ) -> (有効期限のmonotonic時刻, 検索結果)
+_lens_cache: OrderedDict[tuple[bytes, str], tuple[float, GoogleLensResponse]] = (
+    OrderedDict()
+)
 
 
-def _extract_image_base64_from_messages(messages: list) -> Optional[str]:
-    """メッセージから画像Base64を抽出"""
+def _parse_product_identification(text: str) -> tuple[Optional[str], list[str]]:
+    """LLM応答から商品名と特徴をパース"""
+    item_name = None
+    visual_features = []
+
+    for key, value in _IDENTIFICATION_LINE_RE.findall(text):
+        if key == "商品名":
+            item_name = value
+        else:
+            visual_features = [f for f in _FEATURE_SEP_RE.split(value) if f]
+
+    return item_name, visual_features
+
+
+def _identification_complete(text: str) -> bool:
+    """商品名・特徴の両方の行が改行まで出力されたか"""
+    return len(set(_IDENTIFICATION_DONE_RE.findall(text))) == 2
+
+
+async def _identify_product_name(
+    image_part: types.Part,
+    lens_result: GoogleLensResponse,
+) -> tuple[Optional[str], list[str]]:
+    """
+    LLMで画像+Google Lens結果から正確な商品名を特定
+
+    Returns:
+        (item_name, visual_features)
+    """
+    # 固定の指示（システムプロンプト）を先頭に、リクエストごとに変わる
+    # Google Lens結果を画像の後ろに置き、共通プレフィックスを暗黙キャッシュに載せる
+    contents = [
+        image_part,
+        types.Part.from_text(
+            text=f"【Google Lens検索結果】\n{lens_result.to_llm_context()}"
+        ),
+    ]
+
+    # 応答をストリーミングで受け取り、商品名・特徴の2行が揃った時点で生成を打ち切る
+    # （末尾の補足説明などの生成完了を待たない）
+    parts: list[str] = []
+    async with gemini_limiter:
+        stream = await get_genai_client().aio.models.generate_content_stream(
+            model=settings.MODEL_VISION_NODE,
+            contents=contents,
+            config=_IDENTIFY_CONFIG,
+        )
+    try:
+        async for chunk in stream:
+            text = chunk.text or ""
+            parts.append(text)
+            if "\n" in text and _identification_complete("".join(parts)):
+                break
+    finally:
+        await stream.aclose()
+
+    return _parse_product_identification("".join(parts))
+
+
+def _extract_image_from_messages(
+    messages: list,
+    image_bytes: Optional[bytes] = None,
+) -> Optional[types.Part]:
+    """
+    メッセージから画像を抽出し、Gemini に渡す Part を作る
+
+    呼び出し側でデコード済みのバイナリがあれば、Base64を再デコードせずに使う
+    （data URLからはMIMEタイプだけを取得する）。
+    """
     for msg in messages:
         if hasattr(msg, "content") and isinstance(msg.content, list):
             for content in msg.content:
@@ -110,13 +244,51 @@ def _extract_image_base64_from_messages(messages: list) -> Optional[str]:
                     )
                     # data:image/...;base64,... 形式から抽出
                     if url.startswith("data:image"):
-                        match = re.match(r"data:image/[^;]+;base64,(.+)", url)
-                        if match:
-                            return match.group(1)
-                        return url.split(",", 1)[-1] if "," in url else None
+                        match = _DATA_URL_RE.match(url)
+                        mime_type = match.group(1) if match else _DEFAULT_IMAGE_MIME
+                        if image_bytes is None:
+                            if match:
+                                payload = url[match.end() :]
+                            elif "," in url:
+                                payload = url.split(",", 1)[-1]
+                            else:
+                                return None
+                            try:
+                                image_bytes = binascii.a2b_base64(payload)
+                            except binascii.Error:
+                                return None
+                        if not image_bytes:
+                            return None
+                        return types.Part.from_bytes(
+                            data=image_bytes, mime_type=mime_type
+                        )
+    if image_bytes:
+        return types.Part.from_bytes(data=image_bytes, mime_type=_DEFAULT_IMAGE_MIME)
     return None
 
 
+def _knowledge_graph_agrees(lens_result: GoogleLensResponse) -> bool:
+    """
+    ナレッジグラフの商品名が上位の類似商品と一致しているか
+
+    ナレッジグラフのタイトルの先頭語（ブランド名など）が、上位3件の
+    類似商品のうち2件以上のタイトルに単語として含まれていれば一致とみなす
+    （部分文字列では判定しない: "Apple" は "Pineapple" に一致しない）。
+    """
+    kg = lens_result.knowledge_graph
+    if not kg or not kg.title:
+        return False
+    head = _TITLE_TOKEN_RE.search(kg.title.casefold())
+    if head is None:
+        return False
+    agreeing = sum(
+        1
+        for match in lens_result.visual_matches[:3]
+        if head.group() in _TITLE_TOKEN_RE.findall(match.title.casefold())
+    )
+    return agreeing >= 2
+
+
 def _map_lens_result_to_analysis(
     lens_result: GoogleLensResponse,
     llm_item_name: Optional[str] = None,
@@ -167,71 +339,205 @@ def _map_lens_result_to_analysis(
     )
 
 
-async def _check_guardrails(messages: list) -> Optional[InitialAnalysis]:
+def _image_digest(image_bytes: bytes) -> bytes:
+    """画像バイナリのSHA-256（ガードレール・Google Lensのキャッシュキー）"""
+    return hashlib.sha256(image_bytes).digest()
+
+
+async def _run_guardrail_llm(image_part: types.Part) -> Optional[InitialAnalysis]:
+    """
+    軽量LLMでガードレール判定を実行
+
+    禁止コンテンツ（顔、個人情報など）を検出した場合はInitialAnalysisを返す。
+    問題なければNoneを返す。LLM呼び出しの失敗は例外として呼び出し側に伝える。
+
+    通常は1文字（Y/N）の判定だけを行い、禁止と判定した場合のみ理由を取得する。
+    GUARDRAIL_VERBOSE が有効なら、常に観察内容・理由付きで判定する。
+    """
+    client = get_genai_client()
+
+    if not settings.GUARDRAIL_VERBOSE:
+        async with gemini_limiter:
+            response = await client.aio.models.generate_content(
+                model=settings.MODEL_GUARDRAIL,
+                contents=[image_part],
+                config=_GUARDRAIL_VERDICT_CONFIG,
+            )
+        verdict = (response.text or "").strip().upper()
+        logger.info(f"Guardrail verdict: {verdict}")
+        if not verdict.startswith(_GUARDRAIL_VERDICT_PROHIBITED):
+            return None
+
+    # 禁止と判定した場合（または詳細モード）は、ユーザーに示す理由を取得する
+    try:
+        async with gemini_limiter:
+            response = await client.aio.models.generate_content(
+                model=settings.MODEL_GUARDRAIL,
+                contents=[image_part],
+                config=_GUARDRAIL_CONFIG,
+            )
+        result = GuardrailResult.model_validate_json(response.text or "")
+    except Exception as e:
+        if settings.GUARDRAIL_VERBOSE:
+            raise
+        # 簡易判定で禁止と判定済みのため、理由を取得できなくても禁止として扱う
+        # （ここで例外を伝えると判定失敗として処理が続行され、画像が外部に送られる）
+        logger.warning(f"Guardrail reason lookup failed, treating as prohibited: {e}")
+        return InitialAnalysis(
+            category_type="prohibited",
+            confidence="high",
+            reasoning=_GUARDRAIL_FALLBACK_REASON,
+        )
+    logger.info(
+        f"Guardrail response: is_prohibited={result.is_prohibited}, "
+        f"observation={result.observation}, reason={result.reason}"
+    )
+
+    # 簡易判定で禁止とした場合は、理由取得の判定結果に関わらず禁止として扱う
+    if result.is_prohibited or not settings.GUARDRAIL_VERBOSE:
+        logger.info("Guardrail detected prohibited content")
+        return InitialAnalysis(
+            category_type="prohibited",
+            confidence="high",
+            reasoning=f"禁止コンテンツが検出されました: {result.reason}",
+        )
+
+    return None
+
+
+def _on_guardrail_done(key: tuple[bytes, str], task: asyncio.Task) -> None:
+    """判定タスク完了時に、成功した判定結果だけをキャッシュする"""
+    _guardrail_inflight.pop(key, None)
+    if task.cancelled() or task.exception() is not None:
+        return
+    _guardrail_cache[key] = task.result()
+    while len(_guardrail_cache) > GUARDRAIL_CACHE_MAX_SIZE:
+        _guardrail_cache.popitem(last=False)
+
+
+async def _check_guardrails(
+    image_part: types.Part,
+    image_digest: bytes,
+) -> Optional[InitialAnalysis]:
     """
     軽量LLMでガードレールチェック
 
     禁止コンテンツ（顔、個人情報など）を検出した場合はInitialAnalysisを返す。
     問題なければNoneを返す。
+
+    同じ画像（SHA-256が一致）の判定結果はモデル名ごとにキャッシュし、
+    再査定・重複アップロードではLLMを呼び出さない。同じ画像の判定が
+    並行した場合は、実行中の1回の呼び出しを共有する。
+    判定に失敗した場合はキャッシュせず、次回のリクエストで再判定する。
     """
     if not settings.ENABLE_GUARDRAIL_CHECK:
         return None
 
+    key = (image_digest, settings.MODEL_GUARDRAIL)
+    if key in _guardrail_cache:
+        _guardrail_cache.move_to_end(key)
+        logger.info("Guardrail cache hit")
+        return _guardrail_cache[key]
+
+    task = _guardrail_inflight.get(key)
+    if task is None:
+        task = asyncio.create_task(_run_guardrail_llm(image_part))
+        task.add_done_callback(lambda t: _on_guardrail_done(key, t))
+        _guardrail_inflight[key] = task
+
     try:
-        llm = ChatGoogleGenerativeAI(
-            model=settings.MODEL_GUARDRAIL,
-            project=settings.GCP_PROJECT_ID,
-            location=settings.GCP_LOCATION,
-            temperature=0,
-            vertexai=True,
-        )
+        # 待機側がキャンセルされても、共有している判定は続行させる
+        return await asyncio.shield(task)
+    except Exception as e:
+        logger.warning(f"Guardrail check failed, continuing: {e}")
+        return None
 
-        guardrail_prompt = """あなたは画像の安全性を判定するモデレーターです。
-画像を注意深く観察し、以下の禁止コンテンツが含まれていないか判定してください。
 
-【禁止コンテンツ一覧】
-1. 人物の顔が明確に写っている（※商品を着用しているモデル写真は除く）
-2. 個人情報（住所、電話番号、クレジットカード番号、マイナンバーカード、保険証、パスポート、免許証など）
-3. 現金・有価証券
-4. 動物・ペット・生き物（犬、猫、鳥、魚、爬虫類、昆虫など種類を問わず全ての生き物。ただし動物のぬいぐるみ・フィギュア・イラストなどの「商品」は除く）
+class _TempUploadError(Exception):
+    """SerpApi用の一時画像アップロードの失敗"""
 
-【特に注意すべき点】
-- 画像の主要な被写体が生きている動物・ペットである場合は必ず禁止です
-- このサービスは「商品の査定」が目的です。商品ではないもの（ペット、人物など）は禁止です
-- 判断に迷う場合は禁止と判定してください"""
+    pass
 
-        guardrail_messages = [SystemMessage(content=guardrail_prompt)] + messages
 
-        structured_llm = llm.with_structured_output(GuardrailResult)
-        result = await structured_llm.ainvoke(guardrail_messages)
-        logger.info(
-            f"Guardrail response: is_prohibited={result.is_prohibited}, "
-            f"observation={result.observation}, reason={result.reason}"
-        )
+def _discard_task(task: asyncio.Task) -> None:
+    """不要になったタスクをキャンセルする（完了済みなら例外を回収して警告ログを防ぐ）"""
+    if not task.done():
+        task.cancel()
+    elif not task.cancelled():
+        task.exception()
 
-        if result.is_prohibited:
-            logger.info("Guardrail detected prohibited content")
-            return InitialAnalysis(
-                category_type="prohibited",
-                confidence="high",
-                reasoning=f"禁止コンテンツが検出されました: {result.reason}",
-            )
 
+def _get_cached_lens(
+    image_digest: bytes,
+    search_type: str = "products",
+) -> Optional[GoogleLensResponse]:
+    """キャッシュ済みのGoogle Lens検索結果を返す（期限切れ・未登録はNone）"""
+    key = (image_digest, search_type)
+    cached = _lens_cache.get(key)
+    if cached is None:
+        return None
+    expires_at, lens_result = cached
+    if time.monotonic() >= expires_at:
+        del _lens_cache[key]
         return None
+    _lens_cache.move_to_end(key)
+    logger.info("Google Lens cache hit")
+    return lens_result
+
+
+async def _search_lens(
+    image_bytes: bytes,
+    image_digest: bytes,
+    signed_url_task: Optional[asyncio.Task] = None,
+    search_type: str = "products",
+) -> GoogleLensResponse:
+    """
+    SerpApi用に画像をGCSにアップロードし、Google Lensで検索する
+
+    画像を外部（GCS・SerpApi）に送るため、ガードレール判定を通過した後にだけ呼び出すこと。
+    同じ画像の検索結果は LENS_CACHE_TTL_SECONDS 秒キャッシュし、
+    ヒット時はアップロードと検索を省略する（エラー結果はキャッシュしない）。
+
+    Args:
+        signed_url_task: 事前に開始した署名付きURL生成タスク（あれば署名を待たない）
+
+    Raises:
+        _TempUploadError: 画像のアップロードに失敗した場合
+    """
+    cached = _get_cached_lens(image_digest, search_type)
+    if cached is not None:
+        return cached
 
+    try:
+        signed_url = await signed_url_task if signed_url_task else None
+        image_url = await storage_client.upload_temp_bytes_for_serpapi(
+            image_bytes, image_digest, signed_url
+        )
     except Exception as e:
-        logger.warning(f"Guardrail check failed, continuing: {e}")
-        return None
+        raise _TempUploadError(str(e)) from e
+
+    lens_result = await serpapi_client.search_by_image_url(
+        image_url=image_url,
+        search_type=search_type,
+    )
+
+    if lens_result.status != "Error":
+        _lens_cache[(image_digest, search_type)] = (
+            time.monotonic() + LENS_CACHE_TTL_SECONDS,
+            lens_result,
+        )
+        while len(_lens_cache) > LENS_CACHE_MAX_SIZE:
+            _lens_cache.popitem(last=False)
+
+    return lens_result
 
 
 async def _vision_node_async(state: "AgentState") -> dict:
     """Vision Nodeの非同期実装"""
 
-    messages = state["messages"]
-
-    # Step 1: 画像Base64を抽出
-    image_base64 = _extract_image_base64_from_messages(messages)
-    if not image_base64:
+    # Step 1: 画像を取得（呼び出し側でデコード済みならBase64を再デコードしない）
+    image_part = _extract_image_from_messages(state.messages, state.image_bytes)
+    if image_part is None:
         logger.error("No image found in messages")
         return {
             "analysis_result": InitialAnalysis(
@@ -242,15 +548,31 @@ async def _vision_node_async(state: "AgentState") -> dict:
             )
         }
 
-    # Step 2: ガードレールチェック（prohibitedなら即終了）
-    guardrail_result = await _check_guardrails(messages)
-    if guardrail_result:
-        return {"analysis_result": guardrail_result}
-
-    # Step 3: SerpApi用に画像をGCSにアップロード
+    # Step 2: ガードレールチェック
+    # 禁止コンテンツ（顔・個人情報など）をGCS・SerpApiへ送らないよう、アップロードと
+    # 検索は判定の通過後に行う。判定中はプロセス外に画像を出さない処理
+    # （ハッシュ計算・キャッシュ参照・署名付きURLの事前生成）だけを並行して進める
+    image_bytes = image_part.inline_data.data
+    image_digest = _image_digest(image_bytes)
+    guardrail_task = asyncio.create_task(_check_guardrails(image_part, image_digest))
+    cached_lens = _get_cached_lens(image_digest)
+    signed_url_task = None
+    if cached_lens is None:
+        signed_url_task = asyncio.create_task(
+            storage_client.sign_serpapi_temp_path(
+                storage_client.serpapi_temp_path(image_bytes, image_digest)
+            )
+        )
     try:
-        image_url = await storage_client.upload_temp_image_for_serpapi(image_base64)
-    except Exception as e:
+        guardrail_result = await guardrail_task
+        if guardrail_result:
+            return {"analysis_result": guardrail_result}
+
+        # Step 3-4: GCSアップロード → Google Lens検索（キャッシュヒット時は省略）
+        lens_result = cached_lens
+        if lens_result is None:
+            lens_result = await _search_lens(image_bytes, image_digest, signed_url_task)
+    except _TempUploadError as e:
         logger.error(f"Failed to upload image for SerpApi: {e}")
         return {
             "analysis_result": InitialAnalysis(
@@ -260,20 +582,30 @@ async def _vision_node_async(state: "AgentState") -> dict:
                 retry_advice="もう一度お試しください。",
             )
         }
-
-    # Step 4: SerpApi Google Lens検索
-    lens_result = await serpapi_client.search_by_image_url(
-        image_url=image_url,
-        search_type="products",
-    )
+    finally:
+        _discard_task(guardrail_task)
+        if signed_url_task is not None:
+            _discard_task(signed_url_task)
 
     # Step 4.5: LLMで商品名を特定（Google Lens結果がある場合のみ）
     llm_item_name = None
     llm_visual_features = None
-    if lens_result.has_matches:
+    if (
+        lens_result.has_matches
+        and settings.VISION_KG_SHORT_CIRCUIT
+        and _knowledge_graph_agrees(lens_result)
+    ):
+        # ナレッジグラフの商品名と上位の類似商品が一致していれば、LLMでの特定を省略
+        llm_item_name = lens_result.knowledge_graph.title
+        llm_visual_features = lens_result.get_visual_features(max_items=5)
+        logger.info(
+            "Product identification skipped_llm=True: "
+            "knowledge graph agrees with top matches"
+        )
+    elif lens_result.has_matches:
         try:
             llm_item_name, llm_visual_features = await _identify_product_name(
-                messages, lens_result
+                image_part, lens_result
             )
             logger.info(f"LLM identified product: {llm_item_name}")
         except Exception as e:
@@ -296,9 +628,9 @@ async def vision_node(state: "AgentState") -> dict:
     """
     Vision Node - SerpApi Google Lens統合
 
-    1. 画像をGCSにアップロード
-    2. SerpApi Google Lensで検索
-    3. 軽量LLMでガードレールチェック
+    1. 軽量LLMでガードレールチェック（禁止なら画像を外部に送らず終了）
+    2. 画像をGCSにアップロード（署名付きURLは1と並行して事前に生成）
+    3. SerpApi Google Lensで検索
     4. 結果をInitialAnalysisにマッピング
     """
     try:
@@ -1,12 +1,17 @@
 from typing import Literal, Optional, List
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 CategoryType = Literal["processable", "unknown", "prohibited"]
 
+# 判定結果はキャッシュしてリクエスト間で共有するため、構築後は変更不可にする
+_FROZEN = ConfigDict(frozen=True, extra="ignore")
+
 
 class GuardrailResult(BaseModel):
     """ガードレールチェックの出力スキーマ"""
 
+    model_config = _FROZEN
+
     observation: str = Field(
         ..., description="画像に何が写っているかの簡潔な説明"
     )
@@ -22,6 +27,8 @@ class GuardrailResult(BaseModel):
 class InitialAnalysis(BaseModel):
     """画像分類の出力スキーマ（Node A: 初期分類）"""
 
+    model_config = _FROZEN
+
     category_type: CategoryType = Field(
         ...,
         description="画像の分類結果。査定可能(processable)、不明(unknown)、禁止物(prohibited)から選択",
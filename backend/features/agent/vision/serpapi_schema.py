@@ -1,13 +1,20 @@
 """SerpApi Google Lens レスポンススキーマ"""
 
-from typing import Optional, List
+from functools import cached_property
+from itertools import islice
+from typing import Iterator, Optional, List
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
+
+# 検索結果はキャッシュしてリクエスト間で共有するため、構築後は変更不可にする
+_FROZEN = ConfigDict(frozen=True, extra="ignore")
 
 
 class GoogleLensVisualMatch(BaseModel):
     """Google Lens visual_matches 要素"""
 
+    model_config = _FROZEN
+
     position: int
     title: str
     link: Optional[str] = None
@@ -17,9 +24,18 @@ class GoogleLensVisualMatch(BaseModel):
     in_stock: Optional[bool] = None
 
 
+def _format_visual_match(match: GoogleLensVisualMatch) -> str:
+    """類似商品1件をLLM用の1行にフォーマット（中間文字列を作らず1回で組み立てる）"""
+    source = f" ({match.source})" if match.source else ""
+    price = f" {match.price}" if match.price else ""
+    return f"  - {match.title}{source}{price}"
+
+
 class GoogleLensKnowledgeGraph(BaseModel):
     """Google Lens knowledge_graph データ"""
 
+    model_config = _FROZEN
+
     title: Optional[str] = None
     subtitle: Optional[str] = None
     description: Optional[str] = None
@@ -29,6 +45,8 @@ class GoogleLensKnowledgeGraph(BaseModel):
 class GoogleLensResponse(BaseModel):
     """SerpApi Google Lens レスポンス全体"""
 
+    model_config = _FROZEN
+
     status: str  # "Success" | "Error"
     visual_matches: List[GoogleLensVisualMatch] = []
     knowledge_graph: Optional[GoogleLensKnowledgeGraph] = None
@@ -65,38 +83,45 @@ class GoogleLensResponse(BaseModel):
         Returns:
             特徴のリスト（ソース名、価格情報など）
         """
-        features = []
+        return list(islice(self._iter_features(max_items), max_items))
 
+    def _iter_features(self, max_matches: int) -> Iterator[str]:
+        """視覚的特徴を優先度順に返す（件数の上限は呼び出し側で切り詰める）"""
         # knowledge_graphからの情報
-        if self.knowledge_graph:
-            if self.knowledge_graph.subtitle:
-                features.append(self.knowledge_graph.subtitle)
+        if self.knowledge_graph and self.knowledge_graph.subtitle:
+            yield self.knowledge_graph.subtitle
 
         # visual_matchesからの情報
-        sources_seen = set()
-        for match in self.visual_matches[:max_items]:
+        # 販売元は数件程度のため、setを作らずリストで重複を確認する
+        sources_seen: list[str] = []
+        for match in self.visual_matches[:max_matches]:
             # ソース（販売元）を追加
             if match.source and match.source not in sources_seen:
-                sources_seen.add(match.source)
-                features.append(f"販売: {match.source}")
+                sources_seen.append(match.source)
+                yield f"販売: {match.source}"
 
             # 価格情報があれば追加
-            if match.price and len(features) < max_items:
-                features.append(f"参考価格: {match.price}")
+            if match.price:
+                yield f"参考価格: {match.price}"
                 break  # 価格は1つだけ
 
         # related_queriesから補足情報
-        for query in self.related_queries[:2]:
-            if len(features) < max_items:
-                features.append(query)
-
-        return features[:max_items]
+        yield from self.related_queries[:2]
 
     def to_llm_context(self) -> str:
         """Google Lens結果をLLM分析用のテキストにフォーマット"""
+        return self._llm_context
+
+    @cached_property
+    def _llm_context(self) -> str:
+        """
+        to_llm_context の結果
+
+        同じ検索結果はキャッシュから再利用されるため一度だけ生成する。
+        """
         parts = []
-        if self.knowledge_graph:
-            kg = self.knowledge_graph
+        kg = self.knowledge_graph
+        if kg:
             if kg.title:
                 parts.append(f"【ナレッジグラフ】{kg.title}")
             if kg.subtitle:
@@ -106,13 +131,9 @@ class GoogleLensResponse(BaseModel):
 
         if self.visual_matches:
             parts.append("【類似商品一覧】")
-            for match in self.visual_matches[:10]:
-                line = f"  - {match.title}"
-                if match.source:
-                    line += f" ({match.source})"
-                if match.price:
-                    line += f" {match.price}"
-                parts.append(line)
+            parts.extend(
+                _format_visual_match(match) for match in self.visual_matches[:10]
+            )
 
         if self.related_queries:
             parts.append(f"【関連クエリ】{', '.join(self.related_queries[:5])}")
@@ -1,14 +1,19 @@
+import asyncio
 from contextlib import asynccontextmanager
 from pathlib import Path
 
-from fastapi import FastAPI, Request
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
 from fastapi.staticfiles import StaticFiles
+from starlette.exceptions import HTTPException as StarletteHTTPException
 
 from api.v1.router import api_router
+from core import http_client, vertex_client
 from core.config import settings
+from core.firebase import warmup_firebase
+from core.firestore import firestore_client
 from core.logging import get_logger, setup_logging
+from core.storage import storage_client
 
 # ロギング初期化
 setup_logging()
@@ -21,9 +26,25 @@ async def lifespan(app: FastAPI):
     logger.info(f"Starting {settings.PROJECT_NAME}")
     logger.info(f"Environment: {settings.ENVIRONMENT}")
     logger.info(f"GCP Project: {settings.GCP_PROJECT_ID}")
+
+    # Cloud Storageのクライアント生成・トークン取得は
+    # 起動を待たせずバックグラウンドで行う
+    storage_warmup = asyncio.create_task(asyncio.to_thread(storage_client.warmup))
+
+    # 初回リクエストの認証遅延を避けるため、起動時にFirebaseをウォームアップ
+    try:
+        await asyncio.to_thread(warmup_firebase)
+    except Exception as e:
+        logger.warning(f"Firebase warmup skipped: {e}")
+
     yield
+    storage_warmup.cancel()
     # 終了時
     logger.info(f"Shutting down {settings.PROJECT_NAME}")
+    await firestore_client.close()
+    await storage_client.close()
+    await vertex_client.aclose()
+    await http_client.aclose()
 
 
 is_production = settings.ENVIRONMENT == "production"
@@ -55,24 +76,36 @@ if not FRONTEND_DIST_DIR.exists():
     # 開発環境: backend/src/backend/main.py から ../../../frontend/dist へのパス
     FRONTEND_DIST_DIR = Path(__file__).parent.parent.parent.parent / "frontend" / "dist"
 
+
+class SPAStaticFiles(StaticFiles):
+    """
+    SPA用の静的ファイル配信
+
+    存在するファイルはそのまま返し（Starletteのファイル配信・条件付きリクエストに任せる）、
+    見つからないパスはSPAルーティング用にindex.htmlを返す。
+    """
+
+    async def get_response(self, path: str, scope):
+        try:
+            return await super().get_response(path, scope)
+        except StarletteHTTPException as e:
+            if e.status_code != 404:
+                raise
+            return await super().get_response("index.html", scope)
+
+
 # 静的ファイルの配信設定（frontend/distディレクトリが存在する場合のみ）
+# APIルーターより後にマウントし、API以外の全てのパスをフロントエンドに割り当てる
 if FRONTEND_DIST_DIR.exists():
-    # 静的アセット（JS, CSS, 画像など）を配信
-    app.mount("/assets", StaticFiles(directory=str(FRONTEND_DIST_DIR / "assets")), name="assets")
-
-    # SPAフォールバック: API以外の全てのルートでindex.htmlを返す
-    @app.get("/{full_path:path}")
-    async def serve_spa(request: Request, full_path: str):
-        # 静的ファイルが存在する場合はそれを返す
-        file_path = FRONTEND_DIST_DIR / full_path
-        if file_path.is_file():
-            return FileResponse(file_path)
-        # それ以外はindex.htmlを返す（SPAルーティング用）
-        return FileResponse(FRONTEND_DIST_DIR / "index.html")
+    app.mount(
+        "/",
+        SPAStaticFiles(directory=str(FRONTEND_DIST_DIR), html=True),
+        name="frontend",
+    )
 
 
 # ローカルデバッグ用 (python app/main.py で起動する場合)
 if __name__ == "__main__":
     import uvicorn
 
-    uvicorn.run("backend.main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    uvicorn.run("backend.main:app", host="0.0.0.0", port=8000, reload=True)
@@ -33,7 +33,7 @@ export function useAppraisalHistory(
   const [total, setTotal] = useState(0);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<Error | null>(null);
-  const [offset, setOffset] = useState(0);
+  const [cursor, setCursor] = useState<string | null>(null);
 
   // Fetch history
   const fetchHistory = useCallback(
@@ -48,19 +48,18 @@ export function useAppraisalHistory(
       setLoading(true);
       setError(null);
 
-      const currentOffset = reset ? 0 : offset;
+      const currentCursor = reset ? null : cursor;
 
       try {
-        const data = await getAppraisalHistory(limit, currentOffset);
+        const data = await getAppraisalHistory(limit, currentCursor);
         const appraisalList = data.appraisals ?? [];
 
         if (reset) {
           setAppraisals(appraisalList);
-          setOffset(limit);
         } else {
           setAppraisals((prev) => [...prev, ...appraisalList]);
-          setOffset((prev) => prev + limit);
         }
+        setCursor(data.next_cursor ?? null);
 
         setTotal(data.total ?? 0);
       } catch (err) {
@@ -69,28 +68,28 @@ export function useAppraisalHistory(
         setLoading(false);
       }
     },
-    [user, limit, offset]
+    [user, limit, cursor]
   );
 
   // Initial fetch when user changes
   useEffect(() => {
     if (!authLoading) {
-      setOffset(0);
+      setCursor(null);
       fetchHistory(true);
     }
   }, [user, authLoading]); // eslint-disable-line react-hooks/exhaustive-deps
 
   // Refresh function
   const refresh = useCallback(async () => {
-    setOffset(0);
+    setCursor(null);
     await fetchHistory(true);
   }, [fetchHistory]);
 
   // Load more function
   const loadMore = useCallback(async () => {
-    if (loading || appraisals.length >= total) return;
+    if (loading || !cursor || appraisals.length >= total) return;
     await fetchHistory(false);
-  }, [loading, appraisals.length, total, fetchHistory]);
+  }, [loading, cursor, appraisals.length, total, fetchHistory]);
 
   return {
     appraisals,
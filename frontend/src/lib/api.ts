@@ -109,14 +109,17 @@ export async function apiRequest<T>(
 interface AppraisalHistoryResponse {
   appraisals: AppraisalDocument[];
   total: number;
+  next_cursor: string | null;
 }
 
 export async function getAppraisalHistory(
   limit = 20,
-  offset = 0
+  cursor: string | null = null
 ): Promise<AppraisalHistoryResponse> {
+  const params = new URLSearchParams({ limit: String(limit) });
+  if (cursor) params.set('cursor', cursor);
   return apiRequest<AppraisalHistoryResponse>(
-    `/api/v1/appraisals?limit=${limit}&offset=${offset}`,
+    `/api/v1/appraisals?${params}`,
     {
       requireAuth: true,
     }